@@ -1,27 +1,79 @@
 # Import required FastAPI components for building the API
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-# Import Pydantic for data validation and settings management
-from pydantic import BaseModel
+from fastapi.responses import Response
+# Proper SSE framing (ping frames, efficient send path) via sse-starlette
+from sse_starlette.sse import EventSourceResponse
 # Import OpenAI client for interacting with OpenAI's API
-from openai import OpenAI, APIStatusError
+from openai import AsyncOpenAI, APIStatusError
+import hashlib
+import httpx
+import mimetypes
 import os
+import time
+from contextlib import asynccontextmanager
 from typing import Optional, AsyncGenerator
-import json
+import anyio
+import orjson
 import asyncio
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
 
-# Import the debug logger
+# Import the debug logger and shared request models
 try:
-    from .debug_logger import debug_logger, debug_track
+    from .debug_logger import DebugLogger, bind_debug_logger, debug_track
+    from .core.models import ChatRequest, ApiKeyRequest
 except ImportError:
     # Fallback for when running directly
-    from debug_logger import debug_logger, debug_track
+    from debug_logger import DebugLogger, bind_debug_logger, debug_track
+    from core.models import ChatRequest, ApiKeyRequest
+
+
+# Location of the frontend files served at the root path
+static_files_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'frontend'))
+
+
+def _load_static_cache() -> dict:
+    """Read every frontend file into memory once at startup.
+
+    Serving from this cache avoids the per-request stat() + disk read that
+    StaticFiles pays; the ETag lets browsers revalidate with a cheap 304.
+    Maps relative path -> (body, etag, content type).
+    """
+    cache = {}
+    for root, _dirs, files in os.walk(static_files_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                body = f.read()
+            rel_path = os.path.relpath(path, static_files_dir).replace(os.sep, "/")
+            etag = hashlib.blake2b(body).hexdigest()[:16]
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            cache[rel_path] = (body, etag, content_type)
+    return cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create one shared OpenAI client (and HTTP connection pool) per process.
+
+    Constructing a new client per request forces a fresh TCP/TLS handshake to
+    api.openai.com on every call. Reusing a single pooled httpx client keeps
+    connections alive across requests; per-request API keys are applied with
+    `.with_options(api_key=...)` so all keys share the same pool.
+    """
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+        timeout=httpx.Timeout(600.0, connect=10.0),
+    )
+    # The placeholder key is never sent - every call overrides it via with_options
+    app.state.openai_http = AsyncOpenAI(api_key="placeholder", http_client=http_client)
+    app.state.static_cache = _load_static_cache()
+    yield
+    await app.state.openai_http.close()
+    await http_client.aclose()
+
 
 # Initialize FastAPI application with a title
-app = FastAPI(title="OpenAI Chat API")
+app = FastAPI(title="OpenAI Chat API", lifespan=lifespan)
 
 # Configure CORS (Cross-Origin Resource Sharing) middleware
 # This allows the API to be accessed from different domains/origins
@@ -33,30 +85,30 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers in requests
 )
 
-# Define the data model for chat requests using Pydantic
-# This ensures incoming request data is properly validated
-class ChatRequest(BaseModel):
-    developer_message: str  # Message from the developer/system
-    user_message: str      # Message from the user
-    model: str = "gpt-4.1-mini"  # Optional model selection with default
-    api_key: str          # OpenAI API key for authentication
-    feature_id: Optional[str] = "01-vibe-check"  # Feature selection for homework modules
-
-# Define a Pydantic model for API key validation requests
-class ApiKeyRequest(BaseModel):
-    api_key: str
+# Demo-mode switch: the artificial "pending status" sleeps and the showcase
+# pipeline steps (yellow-status test, optional data sources) are educational
+# only. They run when DEBUG_UI_DEMO is set; production requests pay nothing.
+DEBUG_UI_DEMO = os.environ.get("DEBUG_UI_DEMO", "").lower() in ("1", "true", "yes")
 
-# Helper to format Server-Sent Events (SSE)
-def sse_format(data: dict) -> str:
-    return f"data: {json.dumps(data)}\n\n"
+# Token-batching budget for chat SSE frames. Wrapping every delta in its
+# own frame means one serialization and one socket write per token, which
+# dominates CPU for fast models. Batches grow geometrically from a single
+# token (so time-to-first-token is unchanged) up to a character budget,
+# and are flushed at least every BATCH_FLUSH_INTERVAL seconds so perceived
+# streaming latency stays the same.
+BATCH_GROWTH_FACTOR = 3
+BATCH_MAX_CHARS = 50
+BATCH_FLUSH_INTERVAL = 0.02
 
 # Helper functions with debug tracking
 @debug_track("Preparing OpenAI API Request")
 async def prepare_api_request(developer_message: str, user_message: str, model: str):
     """Prepare the API request payload for OpenAI"""
-    # Small delay to ensure pending status is visible
-    await asyncio.sleep(0.1)
-    
+    if DEBUG_UI_DEMO:
+        # Small delay to ensure pending status is visible
+        await asyncio.sleep(0.1)
+
+
     return {
         "model": model,
         "messages": [
@@ -69,10 +121,11 @@ async def prepare_api_request(developer_message: str, user_message: str, model:
 @debug_track("Calling OpenAI API", track_result=False)
 async def call_openai_api(client, api_payload):
     """Make the actual API call to OpenAI"""
-    # Small delay to ensure pending status is visible
-    await asyncio.sleep(0.1)
-    
-    return client.chat.completions.create(**api_payload)
+    if DEBUG_UI_DEMO:
+        # Small delay to ensure pending status is visible
+        await asyncio.sleep(0.1)
+
+    return await client.chat.completions.create(**api_payload)
 
 @debug_track("Testing Yellow Status (3 Second Wait)")
 async def test_yellow_status():
@@ -98,40 +151,111 @@ async def test_critical_function():
     await asyncio.sleep(0.2)
     return {"status": "Critical function completed successfully"}
 
-@debug_track("Processing Response Stream")
-async def process_response_stream(stream):
-    """Process the streaming response from OpenAI"""
-    # Small delay to ensure pending status is visible
-    await asyncio.sleep(0.1)
-    
-    full_response = ""
+@debug_track("Processing Response Stream", track_result=False)
+async def process_response_stream(stream, emit):
+    """Stream OpenAI deltas to the client through the emit callback.
+
+    Deltas are coalesced into batched SSE frames (see the batching
+    constants above). Awaiting emit for each frame means a slow client
+    applies backpressure here, instead of the whole response buffering
+    in process memory.
+    """
+    if DEBUG_UI_DEMO:
+        # Small delay to ensure pending status is visible
+        await asyncio.sleep(0.1)
+
+    # Collect parts in a list and join once - repeated += on a growing
+    # string is quadratic in response length
+    parts = []
     chunk_count = 0
-    
-    for chunk in stream:
+    pending = []
+    pending_chars = 0
+    batch_limit = 1  # First token always ships alone
+    last_flush = time.monotonic()
+
+    async def flush_pending():
+        nonlocal pending, pending_chars, batch_limit, last_flush
+        if pending:
+            await emit({"type": "chat", "data": "".join(pending)})
+            pending = []
+            pending_chars = 0
+            batch_limit = min(batch_limit * BATCH_GROWTH_FACTOR, BATCH_MAX_CHARS)
+        last_flush = time.monotonic()
+
+    async for chunk in stream:
         if chunk.choices[0].delta.content is not None:
             content = chunk.choices[0].delta.content
-            full_response += content
+            parts.append(content)
             chunk_count += 1
-    
+            pending.append(content)
+            pending_chars += len(content)
+            if (pending_chars >= batch_limit
+                    or time.monotonic() - last_flush >= BATCH_FLUSH_INTERVAL):
+                await flush_pending()
+    await flush_pending()
+
+    full_response = "".join(parts)
     return {
         "full_response": full_response,
         "chunk_count": chunk_count,
         "response_length": len(full_response)
     }
 
+# Cache key-validation results so repeated checks don't each pay a network
+# round-trip to OpenAI. Only SHA-256 hashes of keys are stored, never the
+# keys themselves. Rejected keys are negative-cached for a shorter window
+# so brute-force retries don't turn into upstream API calls either.
+_KEY_CACHE_MAX = 10_000
+_KEY_CACHE_TTL = 300.0  # Seconds a successful validation stays fresh
+_KEY_CACHE_NEGATIVE_TTL = 30.0  # Seconds a 401 rejection stays cached
+_key_cache: dict = {}  # sha256(api_key) -> (valid: bool, expires_at: float)
+
+
+def _hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def _cached_key_validation(api_key: str) -> Optional[bool]:
+    """Return the cached validation verdict, or None if absent/expired"""
+    entry = _key_cache.get(_hash_api_key(api_key))
+    if entry is None:
+        return None
+    valid, expires_at = entry
+    if time.monotonic() >= expires_at:
+        return None
+    return valid
+
+
+def _store_key_validation(api_key: str, valid: bool):
+    if len(_key_cache) >= _KEY_CACHE_MAX:
+        # Reset rather than grow without bound; entries repopulate on demand
+        _key_cache.clear()
+    ttl = _KEY_CACHE_TTL if valid else _KEY_CACHE_NEGATIVE_TTL
+    _key_cache[_hash_api_key(api_key)] = (valid, time.monotonic() + ttl)
+
+
 # Define an endpoint to validate the OpenAI API key
 @app.post("/api/validate-key")
 async def validate_key(request: ApiKeyRequest):
+    # Serve recent verdicts straight from the cache
+    cached = _cached_key_validation(request.api_key)
+    if cached is True:
+        return {"status": "ok"}
+    if cached is False:
+        raise HTTPException(status_code=401, detail="Invalid OpenAI API key.")
+
     try:
-        # Initialize OpenAI client with the provided API key
-        client = OpenAI(api_key=request.api_key)
+        # Bind the provided API key to the shared pooled client
+        client = app.state.openai_http.with_options(api_key=request.api_key)
         # Make a lightweight API call to check if the key is valid
-        client.models.list()
+        await client.models.list()
         # If the call succeeds, the key is valid
+        _store_key_validation(request.api_key, True)
         return {"status": "ok"}
     except APIStatusError as e:
         # Handle authentication errors specifically
         if e.status_code == 401:
+            _store_key_validation(request.api_key, False)
             raise HTTPException(status_code=401, detail="Invalid OpenAI API key.")
         # Handle other API errors
         raise HTTPException(status_code=500, detail=f"An API error occurred: {e}")
@@ -142,170 +266,133 @@ async def validate_key(request: ApiKeyRequest):
 # Define the main chat endpoint that handles POST requests
 @app.post("/api/chat")
 async def chat(request: ChatRequest):
-    debug_logger.clear()
+    # Each request gets its own logger, so concurrent chats never share
+    # (or wipe) each other's debug entries
+    debug_logger = DebugLogger()
+    bind_debug_logger(debug_logger)
+
+    async def event_stream() -> AsyncGenerator[dict, None]:
+        # One memory object stream carries every SSE event (debug updates and
+        # chat tokens). The pipeline task below produces into the send side
+        # while this generator just iterates the receive side - proper async
+        # backpressure, no sentinel, no done()-polling, no drain helpers.
+        send_stream, receive_stream = anyio.create_memory_object_stream(max_buffer_size=256)
+
+        # Set up streaming callback to immediately send debug updates
+        def stream_debug_update(log_entry):
+            try:
+                send_stream.send_nowait({"type": "debug", "data": log_entry})
+            except anyio.WouldBlock:
+                pass  # Drop debug updates rather than block the logger
+
+        debug_logger.set_status_callback(stream_debug_update)
+
+        async def run_pipeline():
+            try:
+                # Log initial user message (streamed via the status callback)
+                debug_logger.add_log(
+                    title="Processing User Message",
+                    content_type="clickable",
+                    data={"user_message": request.user_message},
+                    function_name="chat_endpoint"
+                )
+
+                # Bind the provided API key to the shared pooled client
+                client = app.state.openai_http.with_options(api_key=request.api_key)
+
+                # Educational showcase steps - demo mode only, they add
+                # over 3 seconds of artificial latency per request
+                if DEBUG_UI_DEMO:
+                    # Test yellow status with 3-second delay
+                    await test_yellow_status()
+
+                    # Test optional failure scenario - simulating gathering data
+                    # from multiple sources (some may fail); gather runs them
+                    # concurrently and wakes us exactly once when both finish
+                    data_sources = []
+                    source1_result, source2_result = await asyncio.gather(
+                        test_optional_data_source_1(),  # Will be None due to failure
+                        test_optional_data_source_2(),  # Will contain data
+                        return_exceptions=True,
+                    )
 
-    async def event_stream() -> AsyncGenerator[str, None]:
+                    # Add successful data to our collection (optional sources
+                    # return None on failure; gather surfaces stray exceptions
+                    # as values rather than cancelling the sibling)
+                    if source1_result is not None and not isinstance(source1_result, Exception):
+                        data_sources.append(source1_result)
+                    if source2_result is not None and not isinstance(source2_result, Exception):
+                        data_sources.append(source2_result)
+
+                    # Continue with critical function (this would stop pipeline if it failed)
+                    critical_result = await test_critical_function()
+
+                # Use decorated functions - they will automatically update debug logs
+                api_payload = await prepare_api_request(
+                    request.developer_message,
+                    request.user_message,
+                    request.model
+                )
+
+                # Call OpenAI API
+                stream = await call_openai_api(client, api_payload)
+
+                # Stream the chat response; awaiting the bounded send paces
+                # the OpenAI stream to the client socket's drain rate
+                summary = await process_response_stream(stream, send_stream.send)
+                full_response = summary["full_response"]
+
+                # Log the final response processing
+                debug_logger.add_log(
+                    title="Response Processing Complete",
+                    content_type="clickable",
+                    data={
+                        "full_response": full_response,
+                        "response_length": len(full_response)
+                    },
+                    function_name="chat_endpoint"
+                )
+
+            except Exception as e:
+                import traceback
+                error_data = {
+                    "error_message": str(e),
+                    "error_type": type(e).__name__,
+                    "full_traceback": traceback.format_exc(),
+                    "context": "Main chat endpoint processing"
+                }
+                debug_logger.add_log(
+                    title="Error in Chat Processing",
+                    status="error",
+                    content_type="clickable",  # Make main errors clickable too
+                    data=error_data,
+                    function_name="chat_endpoint"
+                )
+                # Also send an error for the chat
+                await send_stream.send({"type": "error", "data": str(e)})
+            finally:
+                # Closing the send side ends the consumer's async for below
+                send_stream.close()
+
+        pipeline_task = asyncio.create_task(run_pipeline())
         try:
-            # Create a queue for streaming debug updates in real-time
-            debug_queue = asyncio.Queue()
-            
-            # Set up streaming callback to immediately send debug updates
-            def stream_debug_update(log_entry):
-                try:
-                    debug_queue.put_nowait(log_entry)
-                except asyncio.QueueFull:
-                    pass  # Skip if queue is full
-            
-            debug_logger.set_status_callback(stream_debug_update)
-            
-            # Log initial user message
-            debug_logger.add_log(
-                title="Processing User Message",
-                content_type="clickable",
-                data={"user_message": request.user_message},
-                function_name="chat_endpoint"
-            )
-            yield sse_format({"type": "debug", "data": debug_logger.get_logs()[-1]})
-
-            # Initialize OpenAI client
-            client = OpenAI(api_key=request.api_key)
-
-            # Helper function to drain debug queue
-            async def drain_debug_queue():
-                while not debug_queue.empty():
-                    try:
-                        log_entry = debug_queue.get_nowait()
-                        yield sse_format({"type": "debug", "data": log_entry})
-                    except asyncio.QueueEmpty:
-                        break
-
-            # Test yellow status with 3-second delay
-            test_task = asyncio.create_task(test_yellow_status())
-            
-            # Stream debug updates as they come in during the test
-            while not test_task.done():
-                async for debug_msg in drain_debug_queue():
-                    yield debug_msg
-                await asyncio.sleep(0.01)  # Small delay to prevent busy waiting
-            
-            # Wait for test to complete and get any remaining debug updates
-            await test_task
-            async for debug_msg in drain_debug_queue():
-                yield debug_msg
-
-            # Test optional failure scenario - simulating gathering data from multiple sources
-            data_sources = []
-            
-            # Try to gather data from multiple sources (some may fail)
-            source1_task = asyncio.create_task(test_optional_data_source_1())  # This will fail
-            source2_task = asyncio.create_task(test_optional_data_source_2())  # This will succeed
-            
-            # Stream updates for both data source attempts
-            tasks = [source1_task, source2_task]
-            while any(not task.done() for task in tasks):
-                async for debug_msg in drain_debug_queue():
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            # Collect results (None for failed optional functions)
-            source1_result = await source1_task  # Will be None due to failure
-            source2_result = await source2_task  # Will contain data
-            
-            # Add successful data to our collection
-            if source1_result is not None:
-                data_sources.append(source1_result)
-            if source2_result is not None:
-                data_sources.append(source2_result)
-            
-            async for debug_msg in drain_debug_queue():
-                yield debug_msg
-            
-            # Continue with critical function (this would stop pipeline if it failed)
-            critical_task = asyncio.create_task(test_critical_function())
-            
-            while not critical_task.done():
-                async for debug_msg in drain_debug_queue():
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-                
-            critical_result = await critical_task
-            async for debug_msg in drain_debug_queue():
-                yield debug_msg
-
-            # Use decorated functions - they will automatically update debug logs
-            api_task = asyncio.create_task(prepare_api_request(
-                request.developer_message, 
-                request.user_message, 
-                request.model
-            ))
-            
-            # Stream debug updates as they come in during API preparation
-            while not api_task.done():
-                async for debug_msg in drain_debug_queue():
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            api_payload = await api_task
-            async for debug_msg in drain_debug_queue():
-                yield debug_msg
-
-            # Call OpenAI API
-            call_task = asyncio.create_task(call_openai_api(client, api_payload))
-            
-            # Stream debug updates as they come in during API call
-            while not call_task.done():
-                async for debug_msg in drain_debug_queue():
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            stream = await call_task
-            async for debug_msg in drain_debug_queue():
-                yield debug_msg
-            
-            # Stream the actual chat response
-            full_response = ""
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    content = chunk.choices[0].delta.content
-                    full_response += content
-                    # Stream chat content
-                    yield sse_format({"type": "chat", "data": content})
-            
-            # Log the final response processing
-            debug_logger.add_log(
-                title="Response Processing Complete",
-                content_type="clickable",
-                data={
-                    "full_response": full_response,
-                    "response_length": len(full_response)
-                },
-                function_name="chat_endpoint"
-            )
-            
-            # Stream final debug updates
-            async for debug_msg in drain_debug_queue():
-                yield debug_msg
-
-        except Exception as e:
-            import traceback
-            error_data = {
-                "error_message": str(e),
-                "error_type": type(e).__name__,
-                "full_traceback": traceback.format_exc(),
-                "context": "Main chat endpoint processing"
-            }
-            debug_logger.add_log(
-                title="Error in Chat Processing", 
-                status="error", 
-                content_type="clickable",  # Make main errors clickable too
-                data=error_data,
-                function_name="chat_endpoint"
-            )
-            yield sse_format({"type": "debug", "data": debug_logger.get_logs()[-1]})
-            # Also send an error for the chat
-            yield sse_format({"type": "error", "data": str(e)})
-
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+            async for event in receive_stream:
+                # sse-starlette handles the framing; we just hand it the payload
+                yield {"data": orjson.dumps(event).decode()}
+        finally:
+            # A client disconnect raises GeneratorExit here. Without this
+            # cleanup the pipeline task would block forever on the full
+            # buffer, pinning its OpenAI stream and leaking the task.
+            receive_stream.close()
+            if not pipeline_task.done():
+                pipeline_task.cancel()
+            try:
+                await pipeline_task
+            except asyncio.CancelledError:
+                pass
+
+    # ping frames every 15s keep idle proxies from killing slow streams
+    return EventSourceResponse(event_stream(), ping=15)
 
 # Define a health check endpoint to verify API status
 @app.get("/api/health")
@@ -315,11 +402,37 @@ async def health_check():
 # Entry point for running the application directly
 if __name__ == "__main__":
     import uvicorn
-    # Start the server on all network interfaces (0.0.0.0) on port 8000
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Start the server on all network interfaces (0.0.0.0) on port 8000.
+    # uvloop + httptools speed up the socket-heavy SSE path, and one worker
+    # per core scales past the GIL; each worker builds its own OpenAI client
+    # and connection pool in the lifespan hook.
+    uvicorn.run(
+        "api.app:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=os.cpu_count(),
+        lifespan="on",
+    )
 
-# Serve the frontend
-# This must be after all API routes
-# It serves files from the 'frontend' directory, which is one level up
-static_files_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'frontend'))
-app.mount("/", StaticFiles(directory=static_files_dir, html=True), name="static")
+# Serve the frontend from the in-memory cache built at startup
+# This catch-all must be registered after all API routes
+@app.get("/{path:path}")
+async def serve_static(path: str, request: Request):
+    if path == "":
+        path = "index.html"
+
+    entry = request.app.state.static_cache.get(path)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    body, etag, content_type = entry
+    # Let browsers revalidate with If-None-Match instead of re-downloading
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(
+        content=body,
+        media_type=content_type,
+        headers={"ETag": etag, "Cache-Control": "public, max-age=60"},
+    )
@@ -4,9 +4,10 @@ This is an example of how to structure the app for multiple features
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import Optional
+from sse_starlette.sse import EventSourceResponse
+
+# Shared request models (one compiled Pydantic validator for all app variants)
+from api.core.models import ChatRequest
 
 # Import feature handlers
 from api.features.vibe_check.handler import VibeCheckHandler
@@ -35,14 +36,6 @@ handlers = {
 }
 
 
-class ChatRequest(BaseModel):
-    user_message: str
-    developer_message: str
-    api_key: str
-    model: str = "gpt-4.1-mini"
-    feature_id: str = "01-vibe-check"  # New field for feature selection
-
-
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "features_enabled": list(handlers.keys())}
@@ -59,21 +52,7 @@ async def chat(request: ChatRequest):
         return {"error": f"Feature {request.feature_id} not implemented"}
     
     # Process with feature-specific handler
-    return StreamingResponse(
-        handler.process_chat(request),
-        media_type="text/event-stream"
-    )
-
-
-# Feature-specific endpoints (optional)
-@app.post("/api/vibe-check/chat")
-async def vibe_check_chat(request: ChatRequest):
-    """Direct endpoint for vibe check feature"""
-    handler = handlers["01-vibe-check"]
-    return StreamingResponse(
-        handler.process_chat(request),
-        media_type="text/event-stream"
-    )
+    return EventSourceResponse(handler.process_chat(request), ping=15)
 
 
 # Future feature-specific endpoints
@@ -92,5 +71,14 @@ async def vibe_check_chat(request: ChatRequest):
 
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(
+        "api.app_modular:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=os.cpu_count(),
+        lifespan="on",
+    )
\ No newline at end of file
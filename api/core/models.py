@@ -0,0 +1,20 @@
+"""
+Shared request models for all API app variants
+Declaring these once means Pydantic v2 compiles a single Rust-backed
+validator schema that every app module reuses, instead of each app
+building its own copy at import time
+"""
+from typing import Optional
+from pydantic import BaseModel
+
+
+class ChatRequest(BaseModel):
+    developer_message: str  # Message from the developer/system
+    user_message: str      # Message from the user
+    model: str = "gpt-4.1-mini"  # Optional model selection with default
+    api_key: str          # OpenAI API key for authentication
+    feature_id: Optional[str] = "01-vibe-check"  # Feature selection for homework modules
+
+
+class ApiKeyRequest(BaseModel):
+    api_key: str
@@ -1,17 +1,32 @@
+import os
 import time
-from typing import List, Dict, Any, Optional
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Deque, List, Dict, Any, Optional
 from functools import wraps
 import inspect
 
+# Same demo-mode switch as app.py: the artificial pending-status sleeps
+# are a showcase aid, not something production chats should pay for
+_DEBUG_UI_DEMO = os.environ.get("DEBUG_UI_DEMO", "").lower() in ("1", "true", "yes")
+
+
 class DebugLogger:
+    # Upper bound on retained entries - protects against runaway logging
+    # bugs growing memory without limit (old entries are evicted FIFO)
+    MAX_LOG_ENTRIES = 10_000
+
     def __init__(self):
-        self.logs: List[Dict[str, Any]] = []
+        self.logs: Deque[Dict[str, Any]] = deque(maxlen=self.MAX_LOG_ENTRIES)
         self.current_id = 0
         self.level = 0
         self.status_callback = None  # Callback to stream status updates
 
     def _get_timestamp(self) -> str:
-        return time.strftime("%Y-%m-%dT%H:%M:%S.", time.gmtime()) + f"{time.time() % 1:.3f}".lstrip('0') + "Z"
+        # One datetime call instead of strftime + gmtime + hand-built
+        # millisecond fraction (which also misrounded near .9995)
+        return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
 
     def add_log(
         self,
@@ -34,29 +49,27 @@ class DebugLogger:
             "function_name": function_name,
         }
         self.logs.append(log_entry)
-        
+
         # Call status callback to stream immediately
         if self.status_callback:
             self.status_callback(log_entry)
-            
-        return self.current_id
+
+        # Return the entry itself so callers can stream it directly instead
+        # of re-indexing get_logs()[-1]; the id stays available as entry["id"]
+        return log_entry
 
     def start_section(self, title: str, data: Any = None, content_type: str = "clickable"):
         self.level += 1
-        parent_id = self.add_log(title, content_type=content_type, data=data)
+        parent_id = self.add_log(title, content_type=content_type, data=data)["id"]
         return parent_id
 
     def end_section(self):
         self.level = max(0, self.level - 1)
 
     def get_logs(self) -> List[Dict[str, Any]]:
-        return self.logs
+        # Materialize only when an external caller truly needs a list
+        return list(self.logs)
 
-    def clear(self):
-        self.logs = []
-        self.current_id = 0
-        self.level = 0
-        
     def set_status_callback(self, callback):
         """Set callback function to stream status updates immediately"""
         self.status_callback = callback
@@ -68,200 +81,240 @@ class DebugLogger:
                 log["status"] = status
                 if data is not None:
                     log["content"]["data"] = data
-                
+
                 # Call status callback to stream status update immediately
                 if self.status_callback:
                     self.status_callback(log)
                 break
 
-    def debug_track(self, title=None, content_type="clickable", track_args=True, track_result=True, optional=False):
-        """Decorator to automatically track function execution in debug logs
-        
-        Args:
-            title: Custom display name for the function
-            content_type: "clickable" or "inline" 
-            track_args: Whether to capture function arguments
-            track_result: Whether to capture return value
-            optional: If True, exceptions are caught and logged but not re-raised, allowing pipeline to continue
-        """
-        def decorator(func):
-            @wraps(func)
-            async def async_wrapper(*args, **kwargs):
-                # Auto-generate title if not provided
-                func_title = title or f"Executing {func.__name__.replace('_', ' ').title()}"
-                
-                # Prepare input data
-                input_data = {}
-                if track_args:
-                    try:
-                        # Get function signature to map args to parameter names
-                        sig = inspect.signature(func)
-                        bound_args = sig.bind(*args, **kwargs)
-                        bound_args.apply_defaults()
-                        # Filter out 'self', complex objects, and other non-serializable parameters
-                        for k, v in bound_args.arguments.items():
-                            if k not in ['self', 'cls', 'client'] and not k.startswith('_'):
-                                # Check if value is JSON serializable
-                                try:
-                                    import json
-                                    json.dumps(v)
-                                    input_data[k] = v
-                                except (TypeError, ValueError):
-                                    # For non-serializable objects, store type info
-                                    input_data[k] = f"<{type(v).__name__} object>"
-                    except Exception:
-                        # Fallback if signature binding fails
-                        input_data = {"note": "Could not capture function arguments"}
-                
-                # Start tracking this function (pending status)
-                self.level += 1
-                log_id = self.add_log(
-                    title=func_title,
-                    status="pending",
-                    content_type=content_type,
-                    data=input_data if input_data else None,
-                    function_name=func.__name__
-                )
-                
-                # Small delay to ensure pending status is visible
+
+# Logger for the request currently being processed. Each request constructs
+# (or lazily gets) its own DebugLogger bound to its task context, so
+# concurrent requests never share a log list or wipe each other's entries
+# the way the old module-global singleton + clear() pattern did.
+_current_logger: ContextVar[Optional[DebugLogger]] = ContextVar("debug_logger", default=None)
+
+# Production kill-switch: when DEBUG_STREAM_ENABLED is false, debug_track
+# returns the original function untouched at decoration time, so tracked
+# functions carry zero wrapper overhead per call.
+DEBUG_STREAM_ENABLED = os.environ.get("DEBUG_STREAM_ENABLED", "true").lower() not in ("0", "false", "no")
+
+
+def get_debug_logger() -> DebugLogger:
+    """Return the logger for the current request, creating one if needed"""
+    logger = _current_logger.get()
+    if logger is None:
+        logger = DebugLogger()
+        _current_logger.set(logger)
+    return logger
+
+
+def bind_debug_logger(logger: DebugLogger):
+    """Bind a fresh logger to the current request context"""
+    return _current_logger.set(logger)
+
+
+def debug_track(title=None, content_type="clickable", track_args=True, track_result=True, optional=False):
+    """Decorator to automatically track function execution in debug logs
+
+    The logger is resolved per call from the current request context, so the
+    same decorated function can serve many concurrent requests safely.
+
+    Args:
+        title: Custom display name for the function
+        content_type: "clickable" or "inline"
+        track_args: Whether to capture function arguments
+        track_result: Whether to capture return value
+        optional: If True, exceptions are caught and logged but not re-raised, allowing pipeline to continue
+    """
+    def decorator(func):
+        if not DEBUG_STREAM_ENABLED:
+            # Debug streaming disabled for this process - no wrapper at all
+            return func
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            # Requests that never bound a logger skip all bookkeeping
+            logger = _current_logger.get()
+            if logger is None:
+                return await func(*args, **kwargs)
+
+            # Auto-generate title if not provided
+            func_title = title or f"Executing {func.__name__.replace('_', ' ').title()}"
+
+            # Prepare input data
+            input_data = {}
+            if track_args:
+                try:
+                    # Get function signature to map args to parameter names
+                    sig = inspect.signature(func)
+                    bound_args = sig.bind(*args, **kwargs)
+                    bound_args.apply_defaults()
+                    # Filter out 'self', complex objects, and other non-serializable parameters
+                    for k, v in bound_args.arguments.items():
+                        if k not in ['self', 'cls', 'client'] and not k.startswith('_'):
+                            # Check if value is JSON serializable
+                            try:
+                                import json
+                                json.dumps(v)
+                                input_data[k] = v
+                            except (TypeError, ValueError):
+                                # For non-serializable objects, store type info
+                                input_data[k] = f"<{type(v).__name__} object>"
+                except Exception:
+                    # Fallback if signature binding fails
+                    input_data = {"note": "Could not capture function arguments"}
+
+            # Start tracking this function (pending status)
+            logger.level += 1
+            log_id = logger.add_log(
+                title=func_title,
+                status="pending",
+                content_type=content_type,
+                data=input_data if input_data else None,
+                function_name=func.__name__
+            )["id"]
+
+            # Small delay to ensure pending status is visible (demo only)
+            if _DEBUG_UI_DEMO:
                 import asyncio
                 await asyncio.sleep(0.05)
-                
+
+            try:
+                # Execute the function
+                result = await func(*args, **kwargs)
+
+                # Update with success
+                result_data = input_data.copy() if input_data else {}
+                if track_result and result is not None:
+                    # Only include result if it's reasonably sized
+                    result_str = str(result)
+                    if len(result_str) < 1000:
+                        result_data["result"] = result
+                    else:
+                        result_data["result"] = f"<Large result: {type(result).__name__}>"
+
+                logger.update_log_status(log_id, "success", result_data)
+                return result
+
+            except Exception as e:
+                # Update with error - make it clickable with full details
+                import traceback
+                error_data = input_data.copy() if input_data else {}
+                error_data["error_message"] = str(e)
+                error_data["error_type"] = type(e).__name__
+                error_data["full_traceback"] = traceback.format_exc()
+                error_data["function_name"] = func.__name__
+                error_data["optional_failure"] = str(optional)
+
+                # Update the log entry to be clickable and trigger status callback
+                logger.update_log_status(log_id, "error", error_data)
+                # Also ensure it's clickable
+                for log in logger.logs:
+                    if log["id"] == log_id:
+                        log["content"]["type"] = "clickable"  # Make errors clickable
+                        break
+
+                # Only re-raise if this is not an optional function
+                if not optional:
+                    raise
+
+                # For optional functions, return None and continue pipeline
+                return None
+            finally:
+                logger.level -= 1
+
+        @wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            # Requests that never bound a logger skip all bookkeeping
+            logger = _current_logger.get()
+            if logger is None:
+                return func(*args, **kwargs)
+
+            # Auto-generate title if not provided
+            func_title = title or f"Executing {func.__name__.replace('_', ' ').title()}"
+
+            # Prepare input data
+            input_data = {}
+            if track_args:
                 try:
-                    # Execute the function
-                    result = await func(*args, **kwargs)
-                    
-                    # Update with success
-                    result_data = input_data.copy() if input_data else {}
-                    if track_result and result is not None:
-                        # Only include result if it's reasonably sized
-                        result_str = str(result)
-                        if len(result_str) < 1000:
-                            result_data["result"] = result
-                        else:
-                            result_data["result"] = f"<Large result: {type(result).__name__}>"
-                    
-                    self.update_log_status(log_id, "success", result_data)
-                    return result
-                    
-                except Exception as e:
-                    # Update with error - make it clickable with full details
-                    import traceback
-                    error_data = input_data.copy() if input_data else {}
-                    error_data["error_message"] = str(e)
-                    error_data["error_type"] = type(e).__name__
-                    error_data["full_traceback"] = traceback.format_exc()
-                    error_data["function_name"] = func.__name__
-                    error_data["optional_failure"] = str(optional)
-                    
-                    # Update the log entry to be clickable and trigger status callback
-                    self.update_log_status(log_id, "error", error_data)
-                    # Also ensure it's clickable
-                    for log in self.logs:
-                        if log["id"] == log_id:
-                            log["content"]["type"] = "clickable"  # Make errors clickable
-                            break
-                    
-                    # Only re-raise if this is not an optional function
-                    if not optional:
-                        raise
-                    
-                    # For optional functions, return None and continue pipeline
-                    return None
-                finally:
-                    self.level -= 1
-            
-            @wraps(func)
-            def sync_wrapper(*args, **kwargs):
-                # Auto-generate title if not provided
-                func_title = title or f"Executing {func.__name__.replace('_', ' ').title()}"
-                
-                # Prepare input data
-                input_data = {}
-                if track_args:
-                    try:
-                        # Get function signature to map args to parameter names
-                        sig = inspect.signature(func)
-                        bound_args = sig.bind(*args, **kwargs)
-                        bound_args.apply_defaults()
-                        # Filter out 'self', complex objects, and other non-serializable parameters
-                        for k, v in bound_args.arguments.items():
-                            if k not in ['self', 'cls', 'client'] and not k.startswith('_'):
-                                # Check if value is JSON serializable
-                                try:
-                                    import json
-                                    json.dumps(v)
-                                    input_data[k] = v
-                                except (TypeError, ValueError):
-                                    # For non-serializable objects, store type info
-                                    input_data[k] = f"<{type(v).__name__} object>"
-                    except Exception:
-                        # Fallback if signature binding fails
-                        input_data = {"note": "Could not capture function arguments"}
-                
-                # Start tracking this function (pending status)
-                self.level += 1
-                log_id = self.add_log(
-                    title=func_title,
-                    status="pending",
-                    content_type=content_type,
-                    data=input_data if input_data else None,
-                    function_name=func.__name__
-                )
-                
-                # Small delay to ensure pending status is visible
-                import time
+                    # Get function signature to map args to parameter names
+                    sig = inspect.signature(func)
+                    bound_args = sig.bind(*args, **kwargs)
+                    bound_args.apply_defaults()
+                    # Filter out 'self', complex objects, and other non-serializable parameters
+                    for k, v in bound_args.arguments.items():
+                        if k not in ['self', 'cls', 'client'] and not k.startswith('_'):
+                            # Check if value is JSON serializable
+                            try:
+                                import json
+                                json.dumps(v)
+                                input_data[k] = v
+                            except (TypeError, ValueError):
+                                # For non-serializable objects, store type info
+                                input_data[k] = f"<{type(v).__name__} object>"
+                except Exception:
+                    # Fallback if signature binding fails
+                    input_data = {"note": "Could not capture function arguments"}
+
+            # Start tracking this function (pending status)
+            logger.level += 1
+            log_id = logger.add_log(
+                title=func_title,
+                status="pending",
+                content_type=content_type,
+                data=input_data if input_data else None,
+                function_name=func.__name__
+            )["id"]
+
+            # Small delay to ensure pending status is visible (demo only;
+            # this blocks the event loop, which is tolerable only there)
+            if _DEBUG_UI_DEMO:
                 time.sleep(0.05)
-                
-                try:
-                    # Execute the function
-                    result = func(*args, **kwargs)
-                    
-                    # Update with success
-                    result_data = input_data.copy() if input_data else {}
-                    if track_result and result is not None:
-                        # Only include result if it's reasonably sized
-                        result_str = str(result)
-                        if len(result_str) < 1000:
-                            result_data["result"] = result
-                        else:
-                            result_data["result"] = f"<Large result: {type(result).__name__}>"
-                    
-                    self.update_log_status(log_id, "success", result_data)
-                    return result
-                    
-                except Exception as e:
-                    # Update with error - make it clickable with full details
-                    import traceback
-                    error_data = input_data.copy() if input_data else {}
-                    error_data["error_message"] = str(e)
-                    error_data["error_type"] = type(e).__name__
-                    error_data["full_traceback"] = traceback.format_exc()
-                    error_data["function_name"] = func.__name__
-                    error_data["optional_failure"] = str(optional)
-                    
-                    # Update the log entry to be clickable and trigger status callback
-                    self.update_log_status(log_id, "error", error_data)
-                    # Also ensure it's clickable
-                    for log in self.logs:
-                        if log["id"] == log_id:
-                            log["content"]["type"] = "clickable"  # Make errors clickable
-                            break
-                    
-                    # Only re-raise if this is not an optional function
-                    if not optional:
-                        raise
-                    
-                    # For optional functions, return None and continue pipeline
-                    return None
-                finally:
-                    self.level -= 1
-                    
-            return async_wrapper if inspect.iscoroutinefunction(func) else sync_wrapper
-        return decorator
-
-# Singleton instance
-debug_logger = DebugLogger()
-
-# Convenience decorator function
-debug_track = debug_logger.debug_track
\ No newline at end of file
+
+            try:
+                # Execute the function
+                result = func(*args, **kwargs)
+
+                # Update with success
+                result_data = input_data.copy() if input_data else {}
+                if track_result and result is not None:
+                    # Only include result if it's reasonably sized
+                    result_str = str(result)
+                    if len(result_str) < 1000:
+                        result_data["result"] = result
+                    else:
+                        result_data["result"] = f"<Large result: {type(result).__name__}>"
+
+                logger.update_log_status(log_id, "success", result_data)
+                return result
+
+            except Exception as e:
+                # Update with error - make it clickable with full details
+                import traceback
+                error_data = input_data.copy() if input_data else {}
+                error_data["error_message"] = str(e)
+                error_data["error_type"] = type(e).__name__
+                error_data["full_traceback"] = traceback.format_exc()
+                error_data["function_name"] = func.__name__
+                error_data["optional_failure"] = str(optional)
+
+                # Update the log entry to be clickable and trigger status callback
+                logger.update_log_status(log_id, "error", error_data)
+                # Also ensure it's clickable
+                for log in logger.logs:
+                    if log["id"] == log_id:
+                        log["content"]["type"] = "clickable"  # Make errors clickable
+                        break
+
+                # Only re-raise if this is not an optional function
+                if not optional:
+                    raise
+
+                # For optional functions, return None and continue pipeline
+                return None
+            finally:
+                logger.level -= 1
+
+        return async_wrapper if inspect.iscoroutinefunction(func) else sync_wrapper
+    return decorator
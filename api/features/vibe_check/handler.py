@@ -3,8 +3,8 @@ Vibe Check Feature Handler
 Basic chat functionality - the foundation for all other features
 """
 import asyncio
-from typing import AsyncGenerator
-from openai import OpenAI
+from typing import AsyncGenerator, Optional
+from openai import AsyncOpenAI
 
 try:
     from ...core.base_handler import BaseChatHandler
@@ -17,6 +17,19 @@ except ImportError:
     from debug_logger import debug_track
 
 
+# One shared client (and HTTP connection pool) per process - creating a new
+# client per request forces a fresh TCP/TLS handshake on every chat
+_shared_client: Optional[AsyncOpenAI] = None
+
+
+def get_openai_client(api_key: str) -> AsyncOpenAI:
+    """Return a client bound to api_key that reuses the shared connection pool"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = AsyncOpenAI(api_key=api_key)
+    return _shared_client.with_options(api_key=api_key)
+
+
 class VibeCheckHandler(BaseChatHandler):
     """Handler for basic chat functionality"""
     
@@ -47,58 +60,46 @@ class VibeCheckHandler(BaseChatHandler):
         
         self.debug_logger.set_status_callback(stream_debug_update)
         
-        # Log initial message
-        self.debug_logger.add_log(
+        # Log initial message (add_log returns the entry, stream it directly)
+        entry = self.debug_logger.add_log(
             title="Processing Vibe Check Message",
             content_type="clickable",
             data={"user_message": request.user_message},
             function_name="vibe_check"
         )
-        yield self.sse_format({"type": "debug", "data": self.debug_logger.get_logs()[-1]})
+        yield self.sse_event({"type": "debug", "data": entry})
         
-        # Initialize OpenAI
-        client = OpenAI(api_key=request.api_key)
+        # Bind the request's API key to the shared pooled client
+        client = get_openai_client(request.api_key)
         
-        # Prepare request
-        task = asyncio.create_task(self.prepare_request(
+        # Prepare request - await directly, no create_task + polling needed
+        api_payload = await self.prepare_request(
             request.developer_message,
             request.user_message,
             request.model
-        ))
-        
-        while not task.done():
-            async for debug_msg in self.stream_debug_updates(debug_queue):
-                yield debug_msg
-            await asyncio.sleep(0.01)
-        
-        api_payload = await task
+        )
         async for debug_msg in self.stream_debug_updates(debug_queue):
             yield debug_msg
-        
+
         # Call OpenAI
         @debug_track("Calling OpenAI for Vibe Check", track_result=False)
         async def call_api():
             await asyncio.sleep(0.1)
-            return client.chat.completions.create(**api_payload)
-        
-        call_task = asyncio.create_task(call_api())
-        
-        while not call_task.done():
-            async for debug_msg in self.stream_debug_updates(debug_queue):
-                yield debug_msg
-            await asyncio.sleep(0.01)
-        
-        stream = await call_task
+            return await client.chat.completions.create(**api_payload)
+
+        stream = await call_api()
         async for debug_msg in self.stream_debug_updates(debug_queue):
             yield debug_msg
         
-        # Stream response
-        full_response = ""
-        for chunk in stream:
+        # Stream response, collecting parts in a list and joining once
+        # (repeated += on a string is quadratic in response length)
+        response_parts = []
+        async for chunk in stream:
             if chunk.choices[0].delta.content is not None:
                 content = chunk.choices[0].delta.content
-                full_response += content
-                yield self.sse_format({"type": "chat", "data": content})
+                response_parts.append(content)
+                yield self.sse_event({"type": "chat", "data": content})
+        full_response = "".join(response_parts)
         
         # Log completion
         self.debug_logger.add_log(
@@ -4,14 +4,44 @@ All homework features inherit from this base class
 """
 from abc import ABC, abstractmethod
 from typing import AsyncGenerator, Dict, Any, Optional
-import json
 import asyncio
+import os
+import traceback
+from collections import deque
+
+import httpx
+import orjson
 from fastapi import HTTPException
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from .debug_logger import debug_logger, debug_track
 
 
+# One pooled httpx client shared by every API key, same pattern as
+# api/app.py: constructing a client per request (or per key) builds a
+# fresh pool and TLS context each time, and per-key pools leak sockets
+# when their clients are dropped. The explicit sizing lets many
+# concurrent chats share keep-alive connections instead of the SDK's
+# smaller defaults; the 60s read timeout is per-read, so it never cuts
+# a healthy stream, only a stalled one.
+_shared_http = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=256, max_keepalive_connections=64),
+    timeout=httpx.Timeout(60.0),
+)
+# The placeholder key is never sent - every call rebinds via with_options
+_base_openai = AsyncOpenAI(api_key="placeholder", http_client=_shared_http)
+
+
+def _client_for_key(api_key: str) -> AsyncOpenAI:
+    """Bind an API key to the shared pooled AsyncOpenAI client
+
+    with_options returns a shallow per-key copy that reuses the shared
+    httpx pool, so keys keep connections warm across requests without a
+    pool (and its sockets) per key to leak when a key stops appearing.
+    """
+    return _base_openai.with_options(api_key=api_key)
+
+
 class BaseChatRequest:
     """Base request model that all features can extend"""
     def __init__(self, user_message: str, api_key: str, model: str = "gpt-4.1-mini", **kwargs):
@@ -29,11 +59,26 @@ class BaseChatHandler(ABC):
     
     def __init__(self, feature_name: str):
         self.feature_name = feature_name
+        # function_name slug for log entries, computed once instead of
+        # lower().replace() on every start/complete/error log
+        self._fn_slug = feature_name.lower().replace(' ', '_')
         self.debug_logger = debug_logger
+        # Artificial pause before the OpenAI call so the pending status is
+        # visible in the debug panel. Defaults off - it's a pure latency
+        # tax - and is enabled via e.g. DEBUG_STREAM_DELAY=0.1 in dev
+        self.debug_visibility_delay = float(os.environ.get("DEBUG_STREAM_DELAY", "0") or 0)
+        # get_system_prompt is effectively constant per feature, so the
+        # base pipeline computes it once per handler instance
+        self._cached_system_prompt: Optional[str] = None
         
-    def sse_format(self, data: Dict[str, Any]) -> str:
-        """Format data for Server-Sent Events"""
-        return f"data: {json.dumps(data)}\n\n"
+    def sse_format(self, data: Dict[str, Any]) -> bytes:
+        """Format data for Server-Sent Events
+
+        Runs once per debug event and once per streamed token, so it uses
+        orjson (C-serialized, emits bytes directly) and byte concatenation
+        instead of stdlib json + an intermediate str re-encode.
+        """
+        return b"data: " + orjson.dumps(data) + b"\n\n"
     
     @debug_track("Validating API Key")
     async def validate_api_key(self, api_key: str) -> bool:
@@ -43,73 +88,82 @@ class BaseChatHandler(ABC):
         return True
     
     @debug_track("Initializing OpenAI Client")
-    async def create_openai_client(self, api_key: str) -> OpenAI:
+    async def create_openai_client(self, api_key: str) -> AsyncOpenAI:
         """Create OpenAI client with validation"""
         await self.validate_api_key(api_key)
-        return OpenAI(api_key=api_key)
+        return _client_for_key(api_key)
     
     async def setup_debug_streaming(self) -> tuple:
-        """Set up debug streaming for real-time updates"""
-        debug_queue = asyncio.Queue()
-        
+        """Set up debug streaming for real-time updates
+
+        Uses a plain deque rather than asyncio.Queue: the callback and
+        consumer run on the same event loop, so appends are a single C
+        call with none of Queue's waiter/future bookkeeping per entry.
+        """
+        debug_queue = deque()
+
         def stream_debug_update(log_entry):
-            try:
-                debug_queue.put_nowait(log_entry)
-            except asyncio.QueueFull:
-                pass
-        
+            debug_queue.append(log_entry)
+
         self.debug_logger.set_status_callback(stream_debug_update)
         return debug_queue, self.drain_debug_queue
-    
-    async def drain_debug_queue(self, debug_queue) -> AsyncGenerator[str, None]:
+
+    async def drain_debug_queue(self, debug_queue) -> AsyncGenerator[bytes, None]:
         """Helper to stream debug updates from queue"""
-        while not debug_queue.empty():
-            try:
-                log_entry = debug_queue.get_nowait()
-                yield self.sse_format({"type": "debug", "data": log_entry})
-            except asyncio.QueueEmpty:
-                break
+        while debug_queue:
+            yield self.sse_format({"type": "debug", "data": debug_queue.popleft()})
     
     @debug_track("Preparing Base Messages")
     async def prepare_base_messages(self, user_message: str, system_prompt: str, message_chain: Optional[list] = None) -> list:
-        """Prepare basic message structure that features can extend"""
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add message chain examples if provided (for few-shot prompting)
-        if message_chain:
-            for chain_msg in message_chain:
-                if chain_msg.get('content', '').strip():  # Only add non-empty messages
-                    messages.append({
-                        "role": chain_msg.get('role', 'user'),
-                        "content": chain_msg['content']
-                    })
-        
-        # Add the current user message
-        messages.append({"role": "user", "content": user_message})
-        return messages
+        """Prepare basic message structure that features can extend
+
+        Built as one list literal - system prompt, then any non-empty few-shot
+        chain messages, then the current user message - so the list is
+        sized in a single construction instead of growing append by append.
+        """
+        return [
+            {"role": "system", "content": system_prompt},
+            *(
+                {"role": msg.get('role', 'user'), "content": msg['content']}
+                for msg in (message_chain or ())
+                if msg.get('content', '').strip()
+            ),
+            {"role": "user", "content": user_message},
+        ]
     
     @debug_track("Calling OpenAI API", track_result=False)
-    async def call_openai(self, client: OpenAI, messages: list, model: str) -> Any:
+    async def call_openai(self, client: AsyncOpenAI, messages: list, model: str) -> Any:
         """Standard OpenAI call that all features can use"""
-        await asyncio.sleep(0.1)  # Small delay for debug visibility
-        return client.chat.completions.create(
+        if self.debug_visibility_delay:
+            await asyncio.sleep(self.debug_visibility_delay)
+        return await client.chat.completions.create(
             model=model,
             messages=messages,
             stream=True
         )
-    
-    async def stream_response(self, stream) -> AsyncGenerator[tuple[str, str], None]:
-        """Stream OpenAI response and return content + full response"""
-        full_response = ""
-        for chunk in stream:
-            if chunk.choices[0].delta.content is not None:
-                content = chunk.choices[0].delta.content
-                full_response += content
-                yield content, full_response
+
+    async def stream_response(self, stream) -> AsyncGenerator[str, None]:
+        """Stream OpenAI response, yielding each content delta
+
+        Yields only the incremental content - callers that need the full
+        response collect the deltas into a list and join once, instead of
+        the old per-chunk string concatenation (O(N^2) in response length).
+        """
+        async for chunk in stream:
+            # Bind the delta once per chunk - resolving
+            # chunk.choices[0].delta.content twice doubles the attribute
+            # walk on a loop that runs per token
+            content = chunk.choices[0].delta.content
+            if content:
+                yield content
     
     @abstractmethod
     async def get_system_prompt(self) -> str:
-        """Each feature must define its system prompt"""
+        """Each feature must define its system prompt
+
+        Should be pure - the base pipeline caches the first returned value
+        for the lifetime of the handler instance
+        """
         pass
     
     @abstractmethod
@@ -122,121 +176,130 @@ class BaseChatHandler(ABC):
         """Each feature can enhance messages (add context, etc.)"""
         pass
     
-    async def process_chat(self, request: BaseChatRequest) -> AsyncGenerator[str, None]:
+    async def process_chat(self, request: BaseChatRequest) -> AsyncGenerator[bytes, None]:
         """
         Main chat processing pipeline that all features use
         Features can override specific steps while using the base flow
+
+        Debug entries and chat chunks flow through one event queue: the
+        debug callback enqueues log entries the moment they're created and
+        the pipeline enqueues chat content as it streams in, so the
+        generator below just awaits the next event - no create_task +
+        sleep(0.01) polling loops and no dead latency between steps.
         """
         # Clear previous debug logs
         self.debug_logger.clear()
-        
-        # Set up debug streaming
-        debug_queue, drain_fn = await self.setup_debug_streaming()
-        
-        # Log initial message
-        self.debug_logger.add_log(
-            title=f"Processing {self.feature_name} Message",
-            content_type="clickable",
-            data={"user_message": request.user_message},
-            function_name=f"{self.feature_name.lower()}_chat"
-        )
-        yield self.sse_format({"type": "debug", "data": self.debug_logger.get_logs()[-1]})
-        
+
+        # Same-thread single-consumer channel: a deque for the payloads
+        # (lock-free C appends) and an Event to wake the consumer, instead
+        # of asyncio.Queue's per-put waiter bookkeeping
+        events: deque = deque()
+        wakeup = asyncio.Event()
+        _DONE = object()
+
+        def emit(kind, payload):
+            events.append((kind, payload))
+            wakeup.set()
+
+        self.debug_logger.set_status_callback(lambda log_entry: emit("debug", log_entry))
+
+        async def run_pipeline():
+            try:
+                # Log initial message (the callback queues it for streaming)
+                self.debug_logger.add_log(
+                    title=f"Processing {self.feature_name} Message",
+                    content_type="clickable",
+                    data={"user_message": request.user_message},
+                    function_name=f"{self._fn_slug}_chat"
+                )
+
+                # Step 1: Create OpenAI client
+                client = await self.create_openai_client(request.api_key)
+
+                # Step 2: Process user message (feature-specific)
+                processed_message = await self.process_user_message(request)
+
+                # Step 3: Prepare messages
+                # Use developer_message from request if provided, otherwise use feature's system prompt
+                system_prompt = request.extra_data.get('developer_message')
+                if not system_prompt:
+                    if self._cached_system_prompt is None:
+                        self._cached_system_prompt = await self.get_system_prompt()
+                    system_prompt = self._cached_system_prompt
+                message_chain = request.extra_data.get('message_chain', [])
+                messages = await self.prepare_base_messages(processed_message, system_prompt, message_chain)
+
+                # Step 4: Enhance messages (feature-specific)
+                enhanced_messages = await self.enhance_messages(messages, request)
+
+                # Step 5: Call OpenAI
+                stream = await self.call_openai(client, enhanced_messages, request.model)
+
+                # Step 6: Stream response
+                response_parts = []
+                async for content in self.stream_response(stream):
+                    response_parts.append(content)
+                    emit("chat", content)
+                full_response = "".join(response_parts)
+
+                # Step 7: Log completion
+                self.debug_logger.add_log(
+                    title=f"{self.feature_name} Processing Complete",
+                    content_type="clickable",
+                    data={
+                        "full_response": full_response,
+                        "response_length": len(full_response),
+                        "feature": self.feature_name
+                    },
+                    function_name=f"{self._fn_slug}_complete"
+                )
+
+            except Exception as e:
+                # Log error - formatting the traceback walks the frame
+                # chain and reads source lines from disk via linecache, so
+                # run it in a worker thread while other streams keep going
+                full_traceback = await asyncio.to_thread(
+                    lambda: "".join(traceback.format_exception(type(e), e, e.__traceback__))
+                )
+                self.debug_logger.add_log(
+                    title=f"{self.feature_name} Error",
+                    content_type="clickable",
+                    data={
+                        "error_message": str(e),
+                        "error_type": type(e).__name__,
+                        "full_traceback": full_traceback,
+                        "feature": self.feature_name
+                    },
+                    function_name=f"{self._fn_slug}_error"
+                )
+                raise
+            finally:
+                # Sentinel tells the consumer all events are queued
+                emit(None, _DONE)
+
+        pipeline = asyncio.create_task(run_pipeline())
         try:
-            # Step 1: Create OpenAI client
-            client_task = asyncio.create_task(self.create_openai_client(request.api_key))
-            while not client_task.done():
-                async for debug_msg in drain_fn(debug_queue):
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            client = await client_task
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            
-            # Step 2: Process user message (feature-specific)
-            processed_message_task = asyncio.create_task(self.process_user_message(request))
-            while not processed_message_task.done():
-                async for debug_msg in drain_fn(debug_queue):
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            processed_message = await processed_message_task
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            
-            # Step 3: Prepare messages
-            # Use developer_message from request if provided, otherwise use feature's system prompt
-            system_prompt = request.extra_data.get('developer_message') or await self.get_system_prompt()
-            message_chain = request.extra_data.get('message_chain', [])
-            messages_task = asyncio.create_task(self.prepare_base_messages(processed_message, system_prompt, message_chain))
-            while not messages_task.done():
-                async for debug_msg in drain_fn(debug_queue):
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            messages = await messages_task
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            
-            # Step 4: Enhance messages (feature-specific)
-            enhanced_messages_task = asyncio.create_task(self.enhance_messages(messages, request))
-            while not enhanced_messages_task.done():
-                async for debug_msg in drain_fn(debug_queue):
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            enhanced_messages = await enhanced_messages_task
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            
-            # Step 5: Call OpenAI
-            api_task = asyncio.create_task(self.call_openai(client, enhanced_messages, request.model))
-            while not api_task.done():
-                async for debug_msg in drain_fn(debug_queue):
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            stream = await api_task
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            
-            # Step 6: Stream response
-            full_response = ""
-            async for content, full in self.stream_response(stream):
-                full_response = full
-                yield self.sse_format({"type": "chat", "data": content})
-            
-            # Step 7: Log completion
-            self.debug_logger.add_log(
-                title=f"{self.feature_name} Processing Complete",
-                content_type="clickable",
-                data={
-                    "full_response": full_response,
-                    "response_length": len(full_response),
-                    "feature": self.feature_name
-                },
-                function_name=f"{self.feature_name.lower()}_complete"
-            )
-            
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-                
-        except Exception as e:
-            # Log error
-            import traceback
-            self.debug_logger.add_log(
-                title=f"{self.feature_name} Error",
-                content_type="clickable",
-                data={
-                    "error_message": str(e),
-                    "error_type": type(e).__name__,
-                    "full_traceback": traceback.format_exc(),
-                    "feature": self.feature_name
-                },
-                function_name=f"{self.feature_name.lower()}_error"
-            )
-            
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            raise
\ No newline at end of file
+            done = False
+            while not done:
+                await wakeup.wait()
+                wakeup.clear()
+                while events:
+                    kind, payload = events.popleft()
+                    if payload is _DONE:
+                        done = True
+                        break
+                    yield self.sse_format({"type": kind, "data": payload})
+
+            # Re-raise pipeline failures after the error log entry has
+            # been flushed to the client
+            await pipeline
+        finally:
+            # A client disconnect closes this generator mid-loop; cancel
+            # the pipeline so it stops consuming the OpenAI stream into
+            # a queue nobody will read
+            if not pipeline.done():
+                pipeline.cancel()
+                try:
+                    await pipeline
+                except asyncio.CancelledError:
+                    pass
\ No newline at end of file
@@ -1,19 +1,136 @@
+import asyncio
+import json
+import threading
 import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
 from functools import wraps
 import inspect
-import ast
 import textwrap
 
+# Bound on entries buffered for a threaded sink before the oldest drop
+_SINK_QUEUE_MAX = 8192
+
+# Frames kept when formatting a tracked error's traceback - deep async
+# stacks can chain dozens of frames, each formatted line re-reading
+# source from disk via linecache
+_TB_LIMIT = 20
+
+# Parameter names never captured in the debug panel
+_SKIP_PARAMS = frozenset(('self', 'cls', 'client'))
+
+# Types that serialize to JSON without needing a probe
+_JSON_SAFE = (str, int, float, bool, type(None))
+
+
+def _is_jsonable(value, depth: int = 2) -> bool:
+    """Cheap serializability check for captured args/results
+
+    The old approach json.dumps'ed every value just to see whether it
+    would serialize, walking (and allocating a throwaway string for) the
+    whole payload twice once the frontend re-serializes it. Simple types
+    answer instantly; containers recurse a couple of levels; only
+    ambiguous values fall back to an actual dumps probe.
+    """
+    if isinstance(value, _JSON_SAFE):
+        return True
+    if depth:
+        if isinstance(value, (list, tuple)):
+            return all(_is_jsonable(v, depth - 1) for v in value)
+        if isinstance(value, dict):
+            return all(
+                isinstance(k, str) and _is_jsonable(v, depth - 1)
+                for k, v in value.items()
+            )
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _try_capture(result, max_chars: int = 1000):
+    """Capture a function result for the debug panel in one traversal
+
+    The old success path serialized the result with json.dumps to test
+    serializability, stringified it again with str() to measure it, and
+    then handed it to the frontend to serialize a third time. One strict
+    dumps probe answers both questions. The probe must stay strict (no
+    default=str): anything it lets through is stored raw and serialized
+    again by the SSE path, so a lenient probe would let objects like an
+    AsyncOpenAI client crash the stream downstream.
+    """
+    try:
+        s = json.dumps(result)
+    except (TypeError, ValueError):
+        return f"<{type(result).__name__} object>"
+    if len(s) <= max_chars:
+        return result
+    return f"<Large {type(result).__name__} ({len(s)} chars)>"
+
+
+@dataclass(slots=True)
+class LogEntry:
+    """One debug-panel entry
+
+    A slots dataclass instead of a per-entry dict: fixed-offset attribute
+    access for the add/update hot path and a fraction of the memory per
+    entry over a long session. orjson serializes dataclasses natively, so
+    the SSE streaming paths emit the same JSON shape as before.
+    """
+    id: int
+    parent_id: Optional[int]
+    level: int
+    timestamp: str
+    title: str
+    status: str
+    content: Dict[str, Any]
+    function_name: Optional[str]
+
+
 class DebugLogger:
-    def __init__(self):
-        self.logs: List[Dict[str, Any]] = []
+    def __init__(self, max_logs: Optional[int] = None):
+        # Unbounded list by default. With max_logs set, a ring buffer
+        # (deque with maxlen) evicts the oldest entries so week-long
+        # sessions keep bounded memory and appends never pay a list
+        # realloc-and-copy. Safe to bound small when a status_callback is
+        # streaming every entry out as it's created.
+        self.max_logs = max_logs
+        if max_logs is not None:
+            self.logs: Any = deque(maxlen=max_logs)
+        else:
+            self.logs = []
+        # Index entries by id so status updates are O(1) instead of a
+        # linear scan (every tracked call does one add + one update)
+        self._logs_by_id: Dict[int, LogEntry] = {}
         self.current_id = 0
         self.level = 0
         self.status_callback = None  # Callback to stream status updates
+        # Threaded-sink machinery (only spun up on demand, see
+        # set_status_callback) - a bounded deque drops the oldest entries
+        # rather than stalling callers when the sink can't keep up
+        self._sink_queue: deque = deque(maxlen=_SINK_QUEUE_MAX)
+        self._sink_cond = threading.Condition()
+        self._sink_callback = None
+        self._sink_thread: Optional[threading.Thread] = None
+        # (whole seconds, formatted prefix) - consecutive logs within the
+        # same second reuse the strftime result
+        self._ts_cache = (0, "")
 
     def _get_timestamp(self) -> str:
-        return time.strftime("%Y-%m-%dT%H:%M:%S.", time.gmtime()) + f"{time.time() % 1:.3f}".lstrip('0') + "Z"
+        # One time_ns() read instead of two clock calls, and the strftime
+        # prefix (the expensive part - it re-parses the format string) is
+        # cached per second. The old float-modulo fraction also misrounded
+        # values near .9995 up to a "1000" millisecond field.
+        ns = time.time_ns()
+        secs, rem = divmod(ns, 1_000_000_000)
+        cached_secs, prefix = self._ts_cache
+        if secs != cached_secs:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(secs))
+            self._ts_cache = (secs, prefix)
+        return f"{prefix}.{rem // 1_000_000:03d}Z"
 
     def add_log(
         self,
@@ -25,18 +142,24 @@ class DebugLogger:
         function_name: Optional[str] = None,
     ):
         self.current_id += 1
-        log_entry = {
-            "id": self.current_id,
-            "parent_id": parent_id,
-            "level": self.level,
-            "timestamp": self._get_timestamp(),
-            "title": title,
-            "status": status,
-            "content": {"type": content_type, "data": data},
-            "function_name": function_name,
-        }
+        # In ring-buffer mode the append below drops the oldest entry once
+        # full - evict its id from the index first so the dict can't grow
+        # past the buffer
+        if self.max_logs is not None and len(self.logs) == self.max_logs:
+            self._logs_by_id.pop(self.logs[0].id, None)
+        log_entry = LogEntry(
+            id=self.current_id,
+            parent_id=parent_id,
+            level=self.level,
+            timestamp=self._get_timestamp(),
+            title=title,
+            status=status,
+            content={"type": content_type, "data": data},
+            function_name=function_name,
+        )
         self.logs.append(log_entry)
-        
+        self._logs_by_id[self.current_id] = log_entry
+
         # Call status callback to stream immediately
         if self.status_callback:
             self.status_callback(log_entry)
@@ -51,17 +174,54 @@ class DebugLogger:
     def end_section(self):
         self.level = max(0, self.level - 1)
 
-    def get_logs(self) -> List[Dict[str, Any]]:
-        return self.logs
+    def get_logs(self) -> List[LogEntry]:
+        logs = self.logs
+        # Callers index and slice the result, so ring-buffer mode hands
+        # back a list copy; the default list is returned as-is
+        return logs if type(logs) is list else list(logs)
 
     def clear(self):
-        self.logs = []
+        self.logs.clear()
+        self._logs_by_id = {}
         self.current_id = 0
         self.level = 0
         
-    def set_status_callback(self, callback):
-        """Set callback function to stream status updates immediately"""
-        self.status_callback = callback
+    def set_status_callback(self, callback, threaded: bool = False):
+        """Set callback function to stream status updates immediately
+
+        With threaded=True the callback runs on a dedicated daemon thread
+        fed by a bounded queue, so callers never pay sink latency inline -
+        use this for callbacks that write to sockets or disk. Callbacks
+        that just append to in-process structures (the SSE handlers)
+        should stay synchronous.
+        """
+        if not threaded:
+            self.status_callback = callback
+            return
+        self._sink_callback = callback
+        if self._sink_thread is None:
+            self._sink_thread = threading.Thread(target=self._drain_sink, daemon=True)
+            self._sink_thread.start()
+        self.status_callback = self._enqueue_for_sink
+
+    def _enqueue_for_sink(self, log_entry):
+        with self._sink_cond:
+            self._sink_queue.append(log_entry)
+            self._sink_cond.notify()
+
+    def _drain_sink(self):
+        while True:
+            with self._sink_cond:
+                while not self._sink_queue:
+                    self._sink_cond.wait()
+                batch = list(self._sink_queue)
+                self._sink_queue.clear()
+            for entry in batch:
+                try:
+                    self._sink_callback(entry)
+                except Exception:
+                    # A failing sink must not kill the drain thread
+                    pass
     
     def _get_function_source(self, func):
         """Extract source code and metadata for a function"""
@@ -106,18 +266,20 @@ class DebugLogger:
                 "docstring": "Documentation not available"
             }
 
-    def update_log_status(self, log_id: int, status: str, data: Any = None):
-        """Update the status and optionally data of an existing log entry"""
-        for log in self.logs:
-            if log["id"] == log_id:
-                log["status"] = status
-                if data is not None:
-                    log["content"]["data"] = data
-                
-                # Call status callback to stream status update immediately
-                if self.status_callback:
-                    self.status_callback(log)
-                break
+    def update_log_status(self, log_id: int, status: str, data: Any = None, content_type: Optional[str] = None):
+        """Update the status and optionally data/content type of an existing log entry"""
+        log = self._logs_by_id.get(log_id)
+        if log is None:
+            return
+        log.status = status
+        if data is not None:
+            log.content["data"] = data
+        if content_type is not None:
+            log.content["type"] = content_type
+
+        # Call status callback to stream status update immediately
+        if self.status_callback:
+            self.status_callback(log)
 
     def debug_track(self, title=None, content_type="clickable", track_args=True, track_result=True, optional=False):
         """Decorator to automatically track function execution in debug logs
@@ -130,237 +292,218 @@ class DebugLogger:
             optional: If True, exceptions are caught and logged but not re-raised, allowing pipeline to continue
         """
         def decorator(func):
-            @wraps(func)
-            async def async_wrapper(*args, **kwargs):
-                # Auto-generate title if not provided
-                func_title = title or f"Executing {func.__name__.replace('_', ' ').title()}"
-                
-                # Prepare input data
+            # Parse the signature once at decoration time - rebuilding it
+            # per call re-parses __code__ and allocates fresh Parameter
+            # objects on every tracked invocation
+            try:
+                sig = inspect.signature(func)
+            except (TypeError, ValueError):
+                sig = None
+
+            # Parameter names are static, so resolve the capturable subset
+            # here instead of re-testing membership and prefix per call
+            tracked_params = tuple(
+                n for n in sig.parameters
+                if n not in _SKIP_PARAMS and not n.startswith('_')
+            ) if sig is not None else ()
+
+            # Defaults for the tracked parameters, resolved once here -
+            # apply_defaults() would re-iterate every parameter and build
+            # a fresh mapping on each call just to fill these in
+            tracked_defaults = {
+                name: p.default
+                for name, p in (sig.parameters.items() if sig is not None else ())
+                if name in tracked_params and p.default is not inspect.Parameter.empty
+            }
+
+            # Source metadata never changes for the life of the process, so
+            # pay the getsourcelines/getfile disk reads once here instead of
+            # on every tracked call
+            source_info = self._get_function_source(func)
+
+            # Title depends only on the decorator arg and the function
+            # name, both fixed here - no per-call replace/title() pass
+            func_title = title or f"Executing {func.__name__.replace('_', ' ').title()}"
+
+            # Bind the logger methods the hot closures call into locals -
+            # a cell load per call instead of an attribute lookup on self
+            add_log = self.add_log
+            update_log_status = self.update_log_status
+
+            # The async and sync wrappers share everything except how the
+            # wrapped function is invoked, so the capture/start/finish logic
+            # lives in closures both reuse instead of two 70-line copies
+            def _capture_inputs(args, kwargs):
+                # Only reached from the capturing wrappers, so track_args
+                # is True and sig is known to exist - no per-call guard
                 input_data = {}
-                if track_args:
-                    try:
-                        # Get function signature to map args to parameter names
-                        sig = inspect.signature(func)
-                        bound_args = sig.bind(*args, **kwargs)
-                        bound_args.apply_defaults()
-                        # Filter out 'self', complex objects, and other non-serializable parameters
-                        for k, v in bound_args.arguments.items():
-                            if k not in ['self', 'cls', 'client'] and not k.startswith('_'):
-                                # Check if value is JSON serializable
-                                try:
-                                    import json
-                                    json.dumps(v)
-                                    input_data[k] = v
-                                except (TypeError, ValueError):
-                                    # For non-serializable objects, store type info
-                                    input_data[k] = f"<{type(v).__name__} object>"
-                    except Exception:
-                        # Fallback if signature binding fails
-                        input_data = {"note": "Could not capture function arguments"}
-                
+                try:
+                    # Map args to parameter names via the cached signature
+                    bound_args = sig.bind(*args, **kwargs)
+                    arguments = bound_args.arguments
+                    # Fill in only the defaults a caller omitted
+                    for k, v in tracked_defaults.items():
+                        arguments.setdefault(k, v)
+                    # Only the precomputed capturable parameters are
+                    # examined - 'self'/'cls'/'client' and _-prefixed
+                    # names were filtered at decoration time
+                    for k in tracked_params:
+                        if k in arguments:
+                            v = arguments[k]
+                            # Check if value is JSON serializable
+                            if _is_jsonable(v):
+                                input_data[k] = v
+                            else:
+                                # For non-serializable objects, store type info
+                                input_data[k] = f"<{type(v).__name__} object>"
+                except Exception:
+                    # Fallback if signature binding fails
+                    input_data = {"note": "Could not capture function arguments"}
+                return input_data
+
+            def _start(input_data):
                 # Start tracking this function (pending status)
                 self.level += 1
-                log_id = self.add_log(
+                return add_log(
                     title=func_title,
                     status="pending",
                     content_type=content_type,
                     data=input_data if input_data else None,
                     function_name=func.__name__
                 )
-                
-                # Small delay to ensure pending status is visible
-                import asyncio
-                await asyncio.sleep(0.05)
-                
+
+            def _finish_ok(log_id, result, input_data):
+                # Update with success - create clear input/output structure
+                result_data = {}
+
+                # Add inputs section if we have input data
+                if input_data:
+                    result_data["\U0001F4E5 INPUTS"] = input_data
+
+                # Add source code section
+                result_data["\U0001F4BB SOURCE"] = source_info
+
+                # Add outputs section if we should track results
+                if track_result:
+                    result_data["\U0001F4E4 OUTPUT"] = (
+                        _try_capture(result) if result is not None else None
+                    )
+
+                update_log_status(log_id, "success", result_data)
+
+            def _finish_err(log_id, e, input_data):
+                # Update with error - create clear input/error structure
+                error_data = {}
+
+                # Add inputs section if we have input data
+                if input_data:
+                    error_data["\U0001F4E5 INPUTS"] = input_data
+
+                # Add source code section
+                error_data["\U0001F4BB SOURCE"] = source_info
+
+                # Add error section
+                error_data["\u274C ERROR"] = {
+                    "error_message": str(e),
+                    "error_type": type(e).__name__,
+                    # Format from the exception object itself with a frame
+                    # cap - format_exc() re-walks thread state and formats
+                    # the entire chain however deep it goes
+                    "full_traceback": "".join(
+                        traceback.format_exception(type(e), e, e.__traceback__, limit=_TB_LIMIT)
+                    ),
+                    "function_name": func.__name__,
+                    "optional_failure": str(optional)
+                }
+
+                # Flip to clickable in the same update so the error entry
+                # is written (and streamed) exactly once
+                update_log_status(log_id, "error", error_data, content_type="clickable")
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                input_data = _capture_inputs(args, kwargs)
+                log_id = _start(input_data)
                 try:
-                    # Execute the function
                     result = await func(*args, **kwargs)
-                    
-                    # Update with success - create clear input/output structure
-                    result_data = {}
-                    
-                    # Add inputs section if we have input data
-                    if input_data:
-                        result_data["📥 INPUTS"] = input_data
-                    
-                    # Add source code section
-                    result_data["💻 SOURCE"] = self._get_function_source(func)
-                    
-                    # Add outputs section if we should track results
-                    if track_result and result is not None:
-                        # Check if result is JSON serializable before including it
-                        try:
-                            import json
-                            json.dumps(result)
-                            # Only include result if it's reasonably sized and serializable
-                            result_str = str(result)
-                            if len(result_str) < 1000:
-                                result_data["📤 OUTPUT"] = result
-                            else:
-                                result_data["📤 OUTPUT"] = f"<Large result: {type(result).__name__}>"
-                        except (TypeError, ValueError):
-                            # For non-serializable results, store type info
-                            result_data["📤 OUTPUT"] = f"<{type(result).__name__} object>"
-                    elif track_result:
-                        result_data["📤 OUTPUT"] = None
-                    
-                    self.update_log_status(log_id, "success", result_data)
+                    _finish_ok(log_id, result, input_data)
                     return result
-                    
                 except Exception as e:
-                    # Update with error - create clear input/error structure
-                    import traceback
-                    error_data = {}
-                    
-                    # Add inputs section if we have input data
-                    if input_data:
-                        error_data["📥 INPUTS"] = input_data
-                    
-                    # Add source code section
-                    error_data["💻 SOURCE"] = self._get_function_source(func)
-                    
-                    # Add error section
-                    error_data["❌ ERROR"] = {
-                        "error_message": str(e),
-                        "error_type": type(e).__name__,
-                        "full_traceback": traceback.format_exc(),
-                        "function_name": func.__name__,
-                        "optional_failure": str(optional)
-                    }
-                    
-                    # Update the log entry to be clickable and trigger status callback
-                    self.update_log_status(log_id, "error", error_data)
-                    # Also ensure it's clickable
-                    for log in self.logs:
-                        if log["id"] == log_id:
-                            log["content"]["type"] = "clickable"  # Make errors clickable
-                            break
-                    
+                    _finish_err(log_id, e, input_data)
                     # Only re-raise if this is not an optional function
                     if not optional:
                         raise
-                    
                     # For optional functions, return None and continue pipeline
                     return None
                 finally:
                     self.level -= 1
-            
+
             @wraps(func)
             def sync_wrapper(*args, **kwargs):
-                # Auto-generate title if not provided
-                func_title = title or f"Executing {func.__name__.replace('_', ' ').title()}"
-                
-                # Prepare input data
-                input_data = {}
-                if track_args:
-                    try:
-                        # Get function signature to map args to parameter names
-                        sig = inspect.signature(func)
-                        bound_args = sig.bind(*args, **kwargs)
-                        bound_args.apply_defaults()
-                        # Filter out 'self', complex objects, and other non-serializable parameters
-                        for k, v in bound_args.arguments.items():
-                            if k not in ['self', 'cls', 'client'] and not k.startswith('_'):
-                                # Check if value is JSON serializable
-                                try:
-                                    import json
-                                    json.dumps(v)
-                                    input_data[k] = v
-                                except (TypeError, ValueError):
-                                    # For non-serializable objects, store type info
-                                    input_data[k] = f"<{type(v).__name__} object>"
-                    except Exception:
-                        # Fallback if signature binding fails
-                        input_data = {"note": "Could not capture function arguments"}
-                
-                # Start tracking this function (pending status)
-                self.level += 1
-                log_id = self.add_log(
-                    title=func_title,
-                    status="pending",
-                    content_type=content_type,
-                    data=input_data if input_data else None,
-                    function_name=func.__name__
-                )
-                
-                # Small delay to ensure pending status is visible
-                import time
-                time.sleep(0.05)
-                
+                input_data = _capture_inputs(args, kwargs)
+                log_id = _start(input_data)
                 try:
-                    # Execute the function
                     result = func(*args, **kwargs)
-                    
-                    # Update with success - create clear input/output structure
-                    result_data = {}
-                    
-                    # Add inputs section if we have input data
-                    if input_data:
-                        result_data["📥 INPUTS"] = input_data
-                    
-                    # Add source code section
-                    result_data["💻 SOURCE"] = self._get_function_source(func)
-                    
-                    # Add outputs section if we should track results
-                    if track_result and result is not None:
-                        # Check if result is JSON serializable before including it
-                        try:
-                            import json
-                            json.dumps(result)
-                            # Only include result if it's reasonably sized and serializable
-                            result_str = str(result)
-                            if len(result_str) < 1000:
-                                result_data["📤 OUTPUT"] = result
-                            else:
-                                result_data["📤 OUTPUT"] = f"<Large result: {type(result).__name__}>"
-                        except (TypeError, ValueError):
-                            # For non-serializable results, store type info
-                            result_data["📤 OUTPUT"] = f"<{type(result).__name__} object>"
-                    elif track_result:
-                        result_data["📤 OUTPUT"] = None
-                    
-                    self.update_log_status(log_id, "success", result_data)
+                    _finish_ok(log_id, result, input_data)
                     return result
-                    
                 except Exception as e:
-                    # Update with error - create clear input/error structure
-                    import traceback
-                    error_data = {}
-                    
-                    # Add inputs section if we have input data
-                    if input_data:
-                        error_data["📥 INPUTS"] = input_data
-                    
-                    # Add source code section
-                    error_data["💻 SOURCE"] = self._get_function_source(func)
-                    
-                    # Add error section
-                    error_data["❌ ERROR"] = {
-                        "error_message": str(e),
-                        "error_type": type(e).__name__,
-                        "full_traceback": traceback.format_exc(),
-                        "function_name": func.__name__,
-                        "optional_failure": str(optional)
-                    }
-                    
-                    # Update the log entry to be clickable and trigger status callback
-                    self.update_log_status(log_id, "error", error_data)
-                    # Also ensure it's clickable
-                    for log in self.logs:
-                        if log["id"] == log_id:
-                            log["content"]["type"] = "clickable"  # Make errors clickable
-                            break
-                    
+                    _finish_err(log_id, e, input_data)
                     # Only re-raise if this is not an optional function
                     if not optional:
                         raise
-                    
                     # For optional functions, return None and continue pipeline
                     return None
                 finally:
                     self.level -= 1
-                    
-            return async_wrapper if inspect.iscoroutinefunction(func) else sync_wrapper
+
+            @wraps(func)
+            async def async_nocapture_wrapper(*args, **kwargs):
+                log_id = _start(None)
+                try:
+                    result = await func(*args, **kwargs)
+                    _finish_ok(log_id, result, None)
+                    return result
+                except Exception as e:
+                    _finish_err(log_id, e, None)
+                    # Only re-raise if this is not an optional function
+                    if not optional:
+                        raise
+                    # For optional functions, return None and continue pipeline
+                    return None
+                finally:
+                    self.level -= 1
+
+            @wraps(func)
+            def sync_nocapture_wrapper(*args, **kwargs):
+                log_id = _start(None)
+                try:
+                    result = func(*args, **kwargs)
+                    _finish_ok(log_id, result, None)
+                    return result
+                except Exception as e:
+                    _finish_err(log_id, e, None)
+                    # Only re-raise if this is not an optional function
+                    if not optional:
+                        raise
+                    # For optional functions, return None and continue pipeline
+                    return None
+                finally:
+                    self.level -= 1
+
+            # Dispatch once at decoration time: track_args=False
+            # decorators, and functions whose allowlist came out empty
+            # (only self/cls/client or _-prefixed parameters), get a
+            # wrapper that never binds the signature or builds the
+            # (discarded) input dict on any call
+            is_async = inspect.iscoroutinefunction(func)
+            if track_args and tracked_params:
+                wrapper = async_wrapper if is_async else sync_wrapper
+            else:
+                wrapper = async_nocapture_wrapper if is_async else sync_nocapture_wrapper
+            if sig is not None:
+                # Keep downstream introspection working on the wrapper
+                wrapper.__signature__ = sig
+            return wrapper
         return decorator
 
 # Singleton instance
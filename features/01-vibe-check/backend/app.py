@@ -2,16 +2,21 @@
 Vibe Check Feature API
 FastAPI application for the basic vibe check feature
 """
+import hashlib
+import time
 from pathlib import Path
 from typing import Optional
 
 # Add base directory to path so we can import base modules
 # sys.path.append(str(Path(__file__).parent.parent.parent.parent))
 
-from fastapi import FastAPI, HTTPException
+import httpx
+import orjson
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
 import asyncio
 
 from base_handler import BaseChatRequest
@@ -22,22 +27,42 @@ from handler import VibeCheckHandler, VibeCheckRequest
 app = FastAPI(
     title="Vibe Check - LLM Bootcamp",
     description="Basic LLM chat interface with debug panel",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson for any route returning Python objects - the stdlib
+    # json.dumps path is one of FastAPI's best-known hot spots
+    default_response_class=ORJSONResponse,
 )
 
+# Compress the JSON and HTML endpoints; tiny payloads stay uncompressed
+# (gzip overhead beats the saving under ~500 bytes). The SSE stream opts
+# out via its Content-Encoding header - compressing it would buffer the
+# incremental flushes that make streaming work.
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
 # Initialize handler
 handler = VibeCheckHandler()
 
 
 class ChatRequest(BaseModel):
-    developer_message: str
-    user_message: str
+    # extra=forbid fast-fails malformed payloads inside pydantic-core,
+    # frozen skips per-instance mutation hooks, and the whitespace strip
+    # means min_length also rejects whitespace-only messages at parse
+    # time - all before any handler code runs
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True, frozen=True)
+
+    # Length bounds enforced at parse time by pydantic-core, so
+    # oversized payloads 422 before touching the pipeline or debug log
+    developer_message: str = Field(max_length=20000)
+    user_message: str = Field(min_length=1, max_length=10000)
     model: str
     api_key: str
     feature_id: Optional[str] = "01-vibe-check"
+    message_chain: Optional[list] = []
 
 
 class KeyValidationRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True, frozen=True)
+
     api_key: str
 
 
@@ -45,21 +70,109 @@ class KeyValidationRequest(BaseModel):
 frontend_path = Path(__file__).parent.parent / "frontend"
 app.mount("/static", StaticFiles(directory=str(frontend_path)), name="static")
 
+# The frontend shell is static, so read it once at import instead of a
+# blocking filesystem read inside the async handler on every GET /; the
+# ETag lets repeat visits answer with a bodyless 304
+_index_path = frontend_path / "index.html"
+_INDEX_BYTES = _index_path.read_bytes() if _index_path.exists() else None
+_INDEX_ETAG = (
+    f'"{hashlib.blake2b(_INDEX_BYTES, digest_size=16).hexdigest()}"'
+    if _INDEX_BYTES is not None else None
+)
+
 
 @app.get("/", response_class=HTMLResponse)
-async def serve_frontend():
+async def serve_frontend(request: Request):
     """Serve the vibe check frontend"""
-    index_path = frontend_path / "index.html"
-    if index_path.exists():
-        return HTMLResponse(content=index_path.read_text(), status_code=200)
-    else:
+    if _INDEX_BYTES is None:
         raise HTTPException(status_code=404, detail="Frontend not found")
+    if request.headers.get("if-none-match") == _INDEX_ETAG:
+        return Response(status_code=304)
+    return HTMLResponse(
+        content=_INDEX_BYTES,
+        headers={"ETag": _INDEX_ETAG, "Cache-Control": "public, max-age=60"},
+    )
+
+
+# These payloads never change, so serialize them once at import and
+# hand the bytes straight to the response - no per-request encoder walk
+_HEALTH_BYTES = orjson.dumps(
+    {"status": "healthy", "feature": "vibe-check", "version": "1.0.0"}
+)
+_FEATURES_BYTES = orjson.dumps({
+    "current_feature": "01-vibe-check",
+    "features": {
+        "01-vibe-check": {
+            "name": "Vibe Check",
+            "description": "Basic LLM chat interface with debug panel",
+            "enabled": True
+        },
+        "02-embeddings-rag": {
+            "name": "Embeddings and RAG",
+            "description": "RAG implementation with document upload",
+            "enabled": False
+        },
+        "03-agents": {
+            "name": "AI Agents",
+            "description": "Multi-agent system with tool usage",
+            "enabled": False
+        }
+    }
+})
 
 
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "feature": "vibe-check", "version": "1.0.0"}
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
+
+
+# One pooled HTTP client for key validation, shared across requests -
+# keeps TCP + TLS warm instead of handshaking per call. (http2 is left
+# off: it would pull in the h2 dependency for no gain on this path.)
+_openai_http = httpx.AsyncClient(
+    base_url="https://api.openai.com/v1",
+    limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+    timeout=httpx.Timeout(10.0),
+)
+
+
+@app.on_event("shutdown")
+async def _close_openai_http():
+    await _openai_http.aclose()
+
+
+# Keys rarely change, so definitive verdicts (valid / rejected) are
+# cached for 5 minutes keyed by a key digest - the raw key never sits
+# in a module-level map. In-flight lookups for the same key share one
+# upstream round-trip instead of stampeding OpenAI.
+_KEY_CACHE_TTL = 300.0
+_KEY_CACHE_MAX = 10_000
+_key_cache: dict = {}     # digest -> (expires_at, valid)
+_key_inflight: dict = {}  # digest -> asyncio.Task
+
+
+async def _check_key_upstream(api_key: str) -> bool:
+    """Ask OpenAI whether the key is live: 200 is valid, 401 is not
+
+    Transport failures and unexpected statuses raise and are never
+    cached - only definitive answers are worth remembering.
+    """
+    try:
+        response = await _openai_http.get(
+            "/models",
+            headers={"Authorization": f"Bearer {api_key}"},
+        )
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=400, detail=f"API validation error: {str(e)}")
+    if response.status_code == 200:
+        return True
+    if response.status_code == 401:
+        return False
+    raise HTTPException(
+        status_code=400,
+        detail=f"API validation error: OpenAI returned status {response.status_code}"
+    )
 
 
 @app.post("/api/validate-key")
@@ -67,10 +180,36 @@ async def validate_api_key(request: KeyValidationRequest):
     """Validate OpenAI API key"""
     try:
         await handler.validate_api_key(request.api_key)
-        return {"valid": True, "message": "API key is valid"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    digest = hashlib.blake2b(request.api_key.encode(), digest_size=16).digest()
+    now = time.monotonic()
+    cached = _key_cache.get(digest)
+    if cached is not None and cached[0] > now:
+        valid = cached[1]
+    else:
+        task = _key_inflight.get(digest)
+        if task is not None:
+            # Another request is already asking OpenAI - share its answer
+            valid = await task
+        else:
+            task = asyncio.ensure_future(_check_key_upstream(request.api_key))
+            _key_inflight[digest] = task
+            try:
+                valid = await task
+            finally:
+                _key_inflight.pop(digest, None)
+            while len(_key_cache) >= _KEY_CACHE_MAX:
+                _key_cache.pop(next(iter(_key_cache)))
+            _key_cache[digest] = (now + _KEY_CACHE_TTL, valid)
+
+    if valid:
+        return {"valid": True, "message": "API key is valid"}
+    raise HTTPException(status_code=400, detail="Invalid API key")
+
 
 @app.post("/api/chat")
 async def chat_endpoint(request: ChatRequest):
@@ -85,17 +224,22 @@ async def chat_endpoint(request: ChatRequest):
             api_key=request.api_key,
             model=request.model,
             developer_message=request.developer_message,
-            feature_id=request.feature_id
+            feature_id=request.feature_id,
+            message_chain=request.message_chain
         )
         
         # Process chat using the handler (do NOT await, pass generator directly)
         return StreamingResponse(
             handler.process_chat(vibe_request),
-            media_type="text/plain",
+            media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
-                "Content-Type": "text/event-stream",
+                # Stop nginx-style proxies from buffering the stream
+                "X-Accel-Buffering": "no",
+                # An explicit encoding makes GZipMiddleware leave the
+                # stream alone - gzip would buffer the SSE flushes
+                "Content-Encoding": "identity",
             }
         )
         
@@ -106,34 +250,27 @@ async def chat_endpoint(request: ChatRequest):
 @app.get("/api/features")
 async def get_features():
     """Get available features for the dropdown"""
-    return {
-        "current_feature": "01-vibe-check",
-        "features": {
-            "01-vibe-check": {
-                "name": "Vibe Check",
-                "description": "Basic LLM chat interface with debug panel",
-                "enabled": True
-            },
-            "02-embeddings-rag": {
-                "name": "Embeddings and RAG", 
-                "description": "RAG implementation with document upload",
-                "enabled": False
-            },
-            "03-agents": {
-                "name": "AI Agents",
-                "description": "Multi-agent system with tool usage", 
-                "enabled": False
-            }
-        }
-    }
+    return Response(content=_FEATURES_BYTES, media_type="application/json")
 
 
 if __name__ == "__main__":
+    import os
     import uvicorn
+    dev = bool(os.getenv("DEV"))
     uvicorn.run(
         "app:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        log_level="info"
+        log_level="info",
+        # uvloop event loop + httptools parser (both ship with
+        # uvicorn[standard]) roughly double plain-asyncio throughput
+        loop="uvloop",
+        http="httptools",
+        # The auto-reloader forces a single worker, so it stays behind
+        # DEV=1. In production each worker handles its own SSE chats, so
+        # run one per core with a floor of two.
+        reload=dev,
+        workers=1 if dev else int(os.getenv("WORKERS", max(2, os.cpu_count() or 2))),
+        limit_concurrency=1000,
+        timeout_keep_alive=30,
     )
\ No newline at end of file
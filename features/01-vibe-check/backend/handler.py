@@ -2,10 +2,65 @@
 Vibe Check Handler - Basic chat functionality
 Inherits from BaseChatHandler and implements simple chat processing
 """
+import asyncio
+import hashlib
+import os
+import re
+import time
+import traceback
+from collections import deque
+
 from base_handler import BaseChatHandler, BaseChatRequest
 from debug_logger import debug_track
 
 
+# SSE micro-batching knobs: a chat frame is flushed after this many
+# tokens or this many milliseconds, whichever comes first. Batching
+# amortizes the per-frame serialize + ASGI send cost at high token
+# rates while staying far below perceptible latency.
+_SSE_BATCH_TOKENS = int(os.environ.get("SSE_BATCH_TOKENS", "16"))
+_SSE_BATCH_SECS = float(os.environ.get("SSE_BATCH_MS", "30")) / 1000.0
+
+# Case-insensitive scan in C - matching against message.lower() would
+# allocate a full copy of a message up to 10,000 chars per request
+_VIBE_RE = re.compile(r"vibe check", re.IGNORECASE)
+
+# Full tracebacks in error log entries are valuable in this educational
+# app, so they default on; set VIBE_CHECK_TB=0 in production to skip
+# the frame walk and linecache reads during upstream failure bursts
+_INCLUDE_TB = os.environ.get("VIBE_CHECK_TB", "1") != "0"
+
+# Exact-repeat response cache: bootcamp students often send the same
+# example prompt, and an identical (api key, developer prompt, message,
+# model) tuple re-buys the full OpenAI call. Hits replay the stored text
+# in slices so the streaming UX is preserved. Multi-turn requests and
+# "vibe check" messages are excluded - the former depend on conversation
+# context, the latter are meant to feel alive, not replayed.
+_RESP_CACHE_TTL = float(os.environ.get("VIBE_RESP_CACHE_TTL", "900"))
+_RESP_CACHE_MAX = 1024
+_RESP_REPLAY_CHARS = 64
+_resp_cache: dict = {}  # digest -> (expires_at, response text)
+
+# The system prompt never changes, so it lives as a module constant and
+# the pipeline caches the first (debug-tracked) fetch per handler
+_SYSTEM_PROMPT = """You are a helpful AI assistant for an LLM bootcamp. 
+
+Your personality:
+- Friendly and encouraging 
+- Educational and clear in explanations
+- Enthusiastic about teaching LLM concepts
+- Use emojis sparingly but effectively
+
+Your role:
+- Help students learn about RAG, prompt engineering, and LLM techniques
+- Provide practical examples and clear explanations
+- Encourage experimentation and learning
+- Be supportive of beginners while being informative
+
+When users say "vibe check", respond with enthusiasm about their learning journey.
+"""
+
+
 class VibeCheckRequest(BaseChatRequest):
     """Request model specific to vibe check feature"""
     
@@ -27,22 +82,7 @@ class VibeCheckHandler(BaseChatHandler):
     @debug_track("Getting System Prompt")
     async def get_system_prompt(self) -> str:
         """Return the system prompt for vibe check"""
-        return """You are a helpful AI assistant for an LLM bootcamp. 
-
-Your personality:
-- Friendly and encouraging 
-- Educational and clear in explanations
-- Enthusiastic about teaching LLM concepts
-- Use emojis sparingly but effectively
-
-Your role:
-- Help students learn about RAG, prompt engineering, and LLM techniques
-- Provide practical examples and clear explanations
-- Encourage experimentation and learning
-- Be supportive of beginners while being informative
-
-When users say "vibe check", respond with enthusiasm about their learning journey.
-"""
+        return _SYSTEM_PROMPT
     
     @debug_track("Processing User Message")
     async def process_user_message(self, request: BaseChatRequest) -> str:
@@ -53,7 +93,7 @@ When users say "vibe check", respond with enthusiasm about their learning journe
         message = request.user_message.strip()
         
         # Add some vibe check specific processing
-        if "vibe check" in message.lower():
+        if _VIBE_RE.search(message):
             # Add some extra context for vibe check requests (but don't change the visible message)
             enhanced_message = f"{message}\n\n(This is a vibe check request - respond with enthusiasm about the user's learning journey!)"
             return enhanced_message
@@ -79,13 +119,11 @@ When users say "vibe check", respond with enthusiasm about their learning journe
         Optional validation specific to vibe check
         This is marked as optional so the pipeline continues even if validation fails
         """
-        # Basic validation
+        # Length bounds are enforced by the API layer's Pydantic model at
+        # parse time; only the whitespace-only case needs a runtime check
         if not request.user_message or len(request.user_message.strip()) == 0:
             raise ValueError("Empty message not allowed")
-        
-        if len(request.user_message) > 10000:
-            raise ValueError("Message too long (max 10,000 characters)")
-        
+
         return True
     
     @debug_track("3-Second Processing Test")
@@ -113,138 +151,194 @@ When users say "vibe check", respond with enthusiasm about their learning journe
     async def process_chat(self, request):
         """
         Override the main chat processing to include vibe check educational tests
+
+        Uses the same single event channel as the base pipeline: the
+        debug callback and the chat batcher both feed one deque and the
+        consumer loop below forwards events in order, replacing the
+        dozen per-step drain loops the old version carried.
         """
         # Clear previous debug logs
         self.debug_logger.clear()
-        
-        # Set up debug streaming
-        debug_queue, drain_fn = await self.setup_debug_streaming()
-        
-        # Log initial message
-        self.debug_logger.add_log(
-            title=f"Processing {self.feature_name} Message",
-            content_type="clickable",
-            data={"user_message": request.user_message},
-            function_name=f"{self.feature_name.lower().replace(' ', '_')}_chat"
-        )
-        yield self.sse_format({"type": "debug", "data": self.debug_logger.get_logs()[-1]})
-        
-        try:
-            import asyncio
-            
-            # Run educational tests in parallel with main processing
-            three_sec_task = asyncio.create_task(self.three_second_test())
-            failure_task = asyncio.create_task(self.parallel_failure_test())
-            
-            # Step 1: Create OpenAI client
-            client_task = asyncio.create_task(self.create_openai_client(request.api_key))
-            while not client_task.done():
-                async for debug_msg in drain_fn(debug_queue):
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            client = await client_task
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            
-            # Step 2: Process user message
-            processed_message_task = asyncio.create_task(self.process_user_message(request))
-            while not processed_message_task.done():
-                async for debug_msg in drain_fn(debug_queue):
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            processed_message = await processed_message_task
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            
-            # Step 3: Prepare messages
-            system_prompt = request.extra_data.get('developer_message') or await self.get_system_prompt()
-            message_chain = request.extra_data.get('message_chain', [])
-            messages_task = asyncio.create_task(self.prepare_base_messages(processed_message, system_prompt, message_chain))
-            while not messages_task.done():
-                async for debug_msg in drain_fn(debug_queue):
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            messages = await messages_task
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            
-            # Step 4: Enhance messages
-            enhanced_messages_task = asyncio.create_task(self.enhance_messages(messages, request))
-            while not enhanced_messages_task.done():
-                async for debug_msg in drain_fn(debug_queue):
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            enhanced_messages = await enhanced_messages_task
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            
-            # Wait for educational tests to complete and stream their results
-            while not three_sec_task.done() or not failure_task.done():
-                async for debug_msg in drain_fn(debug_queue):
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            # Get results (failure_task might return None due to optional=True)
-            three_sec_result = await three_sec_task
-            failure_result = await failure_task  # Could be None if failed
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            
-            # Step 5: Call OpenAI
-            api_task = asyncio.create_task(self.call_openai(client, enhanced_messages, request.model))
-            while not api_task.done():
-                async for debug_msg in drain_fn(debug_queue):
-                    yield debug_msg
-                await asyncio.sleep(0.01)
-            
-            stream = await api_task
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            
-            # Step 6: Stream response
-            full_response = ""
-            async for content, full in self.stream_response(stream):
-                full_response = full
-                yield self.sse_format({"type": "chat", "data": content})
-            
-            # Step 7: Log completion
-            completion_data = {
-                "full_response": full_response,
-                "response_length": len(full_response),
-                "feature": self.feature_name,
-                "three_second_test": three_sec_result,
-                "parallel_test_result": failure_result or "Failed (optional - pipeline continued)"
-            }
-            
-            self.debug_logger.add_log(
-                title=f"{self.feature_name} Processing Complete",
-                content_type="clickable",
-                data=completion_data,
-                function_name=f"{self.feature_name.lower().replace(' ', '_')}_complete"
-            )
-            
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-                
-        except Exception as e:
-            # Log error
-            import traceback
-            self.debug_logger.add_log(
-                title=f"{self.feature_name} Error",
-                content_type="clickable",
-                data={
+
+        events = deque()
+        wakeup = asyncio.Event()
+        _DONE = object()
+
+        def emit(kind, payload):
+            events.append((kind, payload))
+            wakeup.set()
+
+        self.debug_logger.set_status_callback(lambda log_entry: emit("debug", log_entry))
+
+        async def run_pipeline():
+            try:
+                # Log initial message (the callback queues it for streaming)
+                self.debug_logger.add_log(
+                    title=f"Processing {self.feature_name} Message",
+                    content_type="clickable",
+                    data={"user_message": request.user_message},
+                    function_name=f"{self._fn_slug}_chat"
+                )
+
+                # Run educational tests in parallel with main processing -
+                # they stay in flight through the OpenAI call so the
+                # 3-second window overlaps the LLM latency
+                edu_task = asyncio.ensure_future(asyncio.gather(
+                    self.three_second_test(),
+                    self.parallel_failure_test(),
+                    return_exceptions=True,
+                ))
+
+                # Step 1: Create OpenAI client
+                client = await self.create_openai_client(request.api_key)
+
+                # Step 2: Process user message
+                processed_message = await self.process_user_message(request)
+
+                # Step 3: Prepare messages
+                # Same memoization as the base pipeline: the tracked
+                # fetch runs once per handler, later chats reuse it
+                system_prompt = request.extra_data.get('developer_message')
+                if not system_prompt:
+                    if self._cached_system_prompt is None:
+                        self._cached_system_prompt = await self.get_system_prompt()
+                    system_prompt = self._cached_system_prompt
+                message_chain = request.extra_data.get('message_chain', [])
+                messages = await self.prepare_base_messages(processed_message, system_prompt, message_chain)
+
+                # Step 4: Enhance messages
+                enhanced_messages = await self.enhance_messages(messages, request)
+
+                # Exact-match cache in front of the OpenAI call: a repeat
+                # of the same prompt within the TTL replays the stored
+                # text instead of paying the LLM round-trip. Multi-turn
+                # requests bypass the cache entirely - the completion
+                # depends on the whole message chain, not just the last
+                # message - and the API key is part of the digest so one
+                # user's completion is never replayed to another.
+                message_chain = request.extra_data.get('message_chain') or []
+                cacheable = not message_chain and not _VIBE_RE.search(request.user_message)
+                if cacheable:
+                    cache_key = hashlib.blake2b(
+                        "\x00".join((
+                            request.api_key,
+                            request.extra_data.get('developer_message') or "",
+                            request.user_message,
+                            request.model,
+                        )).encode(),
+                        digest_size=16,
+                    ).digest()
+                    cached = _resp_cache.get(cache_key)
+                else:
+                    cached = None
+                if cached is not None and cached[0] > time.monotonic():
+                    full_response = cached[1]
+                    self.debug_logger.add_log(
+                        title=f"{self.feature_name} Response Served From Cache",
+                        content_type="inline",
+                        data={"response_length": len(full_response)},
+                        function_name=f"{self._fn_slug}_cache_hit"
+                    )
+                    # Replay in slices so the client still sees a stream
+                    for i in range(0, len(full_response), _RESP_REPLAY_CHARS):
+                        emit("chat", full_response[i:i + _RESP_REPLAY_CHARS])
+                else:
+                    # Step 5: Call OpenAI
+                    stream = await self.call_openai(client, enhanced_messages, request.model)
+
+                    # Step 6: Stream response - coalesce tokens into size-
+                    # and time-bounded batches so a fast stream doesn't
+                    # become one serialize + ASGI send per token
+                    response_parts = []
+                    batch = []
+                    loop = asyncio.get_running_loop()
+                    last_flush = loop.time()
+                    async for content in self.stream_response(stream):
+                        response_parts.append(content)
+                        batch.append(content)
+                        now = loop.time()
+                        if len(batch) >= _SSE_BATCH_TOKENS or now - last_flush >= _SSE_BATCH_SECS:
+                            emit("chat", "".join(batch))
+                            batch.clear()
+                            last_flush = now
+                    if batch:
+                        emit("chat", "".join(batch))
+                    full_response = "".join(response_parts)
+
+                    if cacheable:
+                        while len(_resp_cache) >= _RESP_CACHE_MAX:
+                            _resp_cache.pop(next(iter(_resp_cache)))
+                        _resp_cache[cache_key] = (time.monotonic() + _RESP_CACHE_TTL, full_response)
+
+                # Collect the overlapped educational-test results. The
+                # optional failure test already returns None when it
+                # fails; return_exceptions contains any stray error.
+                three_sec_result, failure_result = await edu_task
+                if isinstance(failure_result, Exception):
+                    failure_result = None
+
+                # Step 7: Log completion
+                completion_data = {
+                    "full_response": full_response,
+                    "response_length": len(full_response),
+                    "feature": self.feature_name,
+                    "three_second_test": three_sec_result,
+                    "parallel_test_result": failure_result or "Failed (optional - pipeline continued)"
+                }
+
+                self.debug_logger.add_log(
+                    title=f"{self.feature_name} Processing Complete",
+                    content_type="clickable",
+                    data=completion_data,
+                    function_name=f"{self._fn_slug}_complete"
+                )
+
+            except Exception as e:
+                # Log error - the traceback walk formats every frame and
+                # re-reads source from disk, so it's gated and capped
+                error_data = {
                     "error_message": str(e),
                     "error_type": type(e).__name__,
-                    "full_traceback": traceback.format_exc(),
                     "feature": self.feature_name
-                },
-                function_name=f"{self.feature_name.lower().replace(' ', '_')}_error"
-            )
-            
-            async for debug_msg in drain_fn(debug_queue):
-                yield debug_msg
-            raise
\ No newline at end of file
+                }
+                if _INCLUDE_TB:
+                    error_data["full_traceback"] = "".join(
+                        traceback.format_exception(type(e), e, e.__traceback__, limit=20)
+                    )
+                self.debug_logger.add_log(
+                    title=f"{self.feature_name} Error",
+                    content_type="clickable",
+                    data=error_data,
+                    function_name=f"{self._fn_slug}_error"
+                )
+                raise
+            finally:
+                # Sentinel tells the consumer all events are queued
+                emit(None, _DONE)
+
+        pipeline = asyncio.create_task(run_pipeline())
+        try:
+            done = False
+            while not done:
+                await wakeup.wait()
+                wakeup.clear()
+                while events:
+                    kind, payload = events.popleft()
+                    if payload is _DONE:
+                        done = True
+                        break
+                    yield self.sse_format({"type": kind, "data": payload})
+
+            # Re-raise pipeline failures after the error log entry has
+            # been flushed to the client
+            await pipeline
+        finally:
+            # A client disconnect closes this generator mid-loop; cancel
+            # the pipeline so it stops consuming the OpenAI stream into
+            # a queue nobody will read
+            if not pipeline.done():
+                pipeline.cancel()
+                try:
+                    await pipeline
+                except asyncio.CancelledError:
+                    pass
@@ -0,0 +1,69 @@
+"""
+Embedding cache for the RAG feature
+
+Wraps an EmbeddingModel with an in-memory LRU keyed by a digest of
+(model name, text). Re-uploading a document or re-running a search only
+pays the OpenAI embeddings call for texts that have never been embedded
+before - cached texts are filled in locally and only the misses go over
+the wire, in a single batched request.
+"""
+import hashlib
+from collections import OrderedDict
+from typing import List
+
+# Roughly 10k chunks * ~6KB per embedding = tens of MB worst case,
+# well within the deployment's memory budget
+_CACHE_CAPACITY = 10_000
+
+
+class CachedEmbeddingModel:
+    """LRU-cached drop-in for EmbeddingModel.async_get_embeddings"""
+
+    def __init__(self, inner, model_name: str, capacity: int = _CACHE_CAPACITY):
+        self.inner = inner
+        self.model_name = model_name
+        self.capacity = capacity
+        # digest -> embedding, ordered oldest-first for LRU eviction
+        self._cache: OrderedDict = OrderedDict()
+
+    def _key(self, text: str) -> bytes:
+        # Model name is part of the key so a configuration change to a
+        # different embedding model never serves stale vectors
+        return hashlib.sha256(
+            (self.model_name + "\x00" + text).encode("utf-8", "surrogatepass")
+        ).digest()
+
+    async def async_get_embeddings(self, texts: List[str]) -> list:
+        """Return embeddings for texts, calling the API only for cache misses"""
+        results = [None] * len(texts)
+        miss_texts = []
+        miss_positions = {}  # digest -> positions awaiting that embedding
+
+        for i, text in enumerate(texts):
+            key = self._key(text)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                results[i] = cached
+            elif key in miss_positions:
+                # Duplicate within this batch - embed it once
+                miss_positions[key].append(i)
+            else:
+                miss_texts.append(text)
+                miss_positions[key] = [i]
+
+        if miss_texts:
+            fresh = await self.inner.async_get_embeddings(miss_texts)
+            for text, embedding in zip(miss_texts, fresh):
+                key = self._key(text)
+                for pos in miss_positions[key]:
+                    results[pos] = embedding
+                self._cache[key] = embedding
+                while len(self._cache) > self.capacity:
+                    self._cache.popitem(last=False)
+
+        return results
+
+    def __getattr__(self, name):
+        # Anything beyond async_get_embeddings passes through unchanged
+        return getattr(self.inner, name)
@@ -7,6 +7,9 @@ import os
 import time
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+from charset_normalizer import from_bytes
 import nest_asyncio
 nest_asyncio.apply()
 
@@ -22,8 +25,16 @@ from base.backend.debug_logger import debug_track
 
 # Import aimakerspace modules (now available in path)
 from aimakerspace.text_utils import CharacterTextSplitter
-from aimakerspace.vectordatabase import VectorDatabase
 from aimakerspace.openai_utils.embedding import EmbeddingModel
+
+# Rows decoded per block when searching a quantized (float16) store
+_SCORE_BLOCK_ROWS = 8192
+
+# Import the local embedding cache with fallback for direct execution
+try:
+    from .embedding_cache import CachedEmbeddingModel
+except ImportError:
+    from embedding_cache import CachedEmbeddingModel
 from aimakerspace.openai_utils.chatmodel import ChatOpenAI
 from aimakerspace.openai_utils.prompts import SystemRolePrompt, UserRolePrompt
 
@@ -31,19 +42,28 @@ from aimakerspace.openai_utils.prompts import SystemRolePrompt, UserRolePrompt
 class DocumentProcessor:
     """Handle different document types and extract text content"""
     
+    @staticmethod
+    def _decode_text(file_content: bytes, file_kind: str) -> str:
+        """Decode raw bytes, sniffing the encoding for non-UTF8 files"""
+        try:
+            return file_content.decode('utf-8')
+        except UnicodeDecodeError:
+            # Detect the real encoding (cp1252, shift_jis, UTF-16 with
+            # BOM, ...) from a prefix and decode once - the old blind
+            # latin-1 fallback never fails, so it silently mojibaked
+            # anything that wasn't actually latin-1
+            match = from_bytes(file_content[:4096]).best()
+            if match is None:
+                raise ValueError(f"Could not decode {file_kind} file")
+            return file_content.decode(match.encoding, errors='replace')
+    
     @staticmethod
     def extract_text_from_file(file_content: bytes, file_name: str, content_type: str) -> str:
         """Extract text from different file types"""
         
         if content_type == 'text/plain':
             # Handle text files
-            try:
-                return file_content.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    return file_content.decode('latin-1')
-                except UnicodeDecodeError:
-                    raise ValueError("Could not decode text file")
+            return DocumentProcessor._decode_text(file_content, 'text')
         
         elif content_type == 'application/pdf':
             # Handle PDF files
@@ -52,21 +72,23 @@ class DocumentProcessor:
                 import io
                 
                 pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-                text_parts = []
-                
-                # Extract text from each page
+
+                # Stream pages into a single growing buffer instead of a
+                # per-page string list plus a final join, so peak memory
+                # stays near the extracted text size on large PDFs
+                buffer = io.StringIO()
                 for page_num, page in enumerate(pdf_reader.pages, 1):
                     try:
                         page_text = page.extract_text()
                         if page_text.strip():  # Only add non-empty pages
-                            text_parts.append(f"--- Page {page_num} ---\n{page_text}\n")
+                            buffer.write(f"--- Page {page_num} ---\n{page_text}\n\n")
                     except Exception as e:
-                        text_parts.append(f"--- Page {page_num} ---\n[Error extracting text from page: {str(e)}]\n")
-                
-                if not text_parts:
+                        buffer.write(f"--- Page {page_num} ---\n[Error extracting text from page: {str(e)}]\n\n")
+
+                full_text = buffer.getvalue().strip()
+                if not full_text:
                     return f"[PDF File: {file_name}]\nNo extractable text found in PDF"
-                
-                full_text = "\n".join(text_parts).strip()
+
                 return full_text
                 
             except Exception as e:
@@ -79,22 +101,25 @@ class DocumentProcessor:
                 import io
                 
                 doc = docx.Document(io.BytesIO(file_content))
-                text_parts = []
-                
-                # Extract text from paragraphs
-                for para in doc.paragraphs:
-                    if para.text.strip():  # Only add non-empty paragraphs
-                        text_parts.append(para.text)
-                
-                # Extract text from tables
-                for table in doc.tables:
-                    for row in table.rows:
-                        row_text = []
-                        for cell in row.cells:
-                            if cell.text.strip():
-                                row_text.append(cell.text.strip())
-                        if row_text:
-                            text_parts.append(" | ".join(row_text))
+
+                # Extract text from paragraphs - strip each once and
+                # filter the empties in a single comprehension pass
+                text_parts = [
+                    text for text in (para.text for para in doc.paragraphs)
+                    if text.strip()
+                ]
+
+                # Extract text from tables - each cell is stripped
+                # exactly once instead of once to filter and again to
+                # append, and the row loop collapses into a generator
+                text_parts.extend(
+                    row_line
+                    for table in doc.tables
+                    for row in table.rows
+                    if (row_line := " | ".join(
+                        stripped for cell in row.cells if (stripped := cell.text.strip())
+                    ))
+                )
                 
                 if not text_parts:
                     return f"[Word Document: {file_name}]\nNo extractable text found in document"
@@ -107,13 +132,7 @@ class DocumentProcessor:
         
         elif content_type == 'text/markdown':
             # Handle Markdown files
-            try:
-                return file_content.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    return file_content.decode('latin-1')
-                except UnicodeDecodeError:
-                    raise ValueError("Could not decode markdown file")
+            return DocumentProcessor._decode_text(file_content, 'markdown')
         
         else:
             raise ValueError(f"Unsupported file type: {content_type}. Supported types: TXT, PDF, DOC, DOCX, MD")
@@ -131,12 +150,32 @@ class RAGHandler(BaseChatHandler):
         # RAG components (initialized when needed)
         self.text_splitter = None
         self.embedding_model = None
-        self.vector_db = None
         self.chat_model = None
-        
+
+        # Embedding store: one L2-normalized float32 row per chunk in a
+        # single contiguous matrix, so cosine search is one BLAS
+        # matrix-vector product over unit-stride memory instead of the
+        # per-vector Python scan the old VectorDatabase did
+        self.embeddings: Optional[np.ndarray] = None
+        self.chunk_texts: List[str] = []
+        # Backing buffer behind self.embeddings, grown geometrically so
+        # incremental appends don't copy the whole matrix every upload
+        self._embeddings_buf: Optional[np.ndarray] = None
+
         # Chunk metadata tracking
         self.chunk_metadata = {}  # Maps chunk index to metadata
         self.chunk_to_doc_mapping = {}  # Maps chunk global index to doc info
+        self.doc_to_chunk_ids = {}  # Maps doc id to its chunk ids in local order
+        
+        # Split-result cache: (doc_id, chunk_size, chunk_overlap) ->
+        # chunk list, so rebuilds after a new upload don't re-split
+        # documents whose content and splitter settings are unchanged
+        self.doc_chunks_cache = {}
+        
+        # Documents already present in each embedding store - uploads
+        # append to the index instead of rebuilding it from scratch
+        self._indexed_doc_ids = set()
+        self._large_indexed_doc_ids = set()
         
         # Configuration
         self.config = {
@@ -149,11 +188,14 @@ class RAGHandler(BaseChatHandler):
             'rag_k': 4,
             'adjacent_chunks': 1,  # Number of chunks to include on each side
             'scoring_strategy': 'reembed',  # 'reembed', 'average', 'weighted', 'original'
-            'comparison_chunk_size': 3000  # Larger chunk size for comparison
+            'comparison_chunk_size': 3000,  # Larger chunk size for comparison
+            'quantize_embeddings': False  # Store embeddings as float16 (half the RAM)
         }
         
-        # Store alternative vector databases for comparison
-        self.large_chunk_vector_db = None
+        # Store alternative large-chunk embedding store for comparison
+        self.large_embeddings: Optional[np.ndarray] = None
+        self.large_chunk_texts: List[str] = []
+        self._large_embeddings_buf: Optional[np.ndarray] = None
         self.large_chunk_metadata = {}
     
     def process_file_content(self, file_content: bytes, file_name: str, content_type: str) -> str:
@@ -197,7 +239,7 @@ class RAGHandler(BaseChatHandler):
             'content_length': len(file_content),
             'chunks_created': len(chunks),
             'total_documents': len(self.uploaded_documents),
-            'vector_db_ready': self.vector_db is not None and len(self.vector_db.vectors) > 0,
+            'vector_db_ready': self._vector_count() > 0,
             'content_preview': document['preview']
         }
     
@@ -215,10 +257,12 @@ class RAGHandler(BaseChatHandler):
             )
         
         if not self.embedding_model:
-            self.embedding_model = EmbeddingModel(self.config['embedding_model'])
-        
-        if not self.vector_db:
-            self.vector_db = VectorDatabase(self.embedding_model)
+            # LRU cache in front of the API: re-uploads and repeated
+            # queries only embed texts the cache has never seen
+            self.embedding_model = CachedEmbeddingModel(
+                EmbeddingModel(self.config['embedding_model']),
+                self.config['embedding_model'],
+            )
         
         if not self.chat_model:
             self.chat_model = ChatOpenAI(self.config['chat_model'])
@@ -233,31 +277,168 @@ class RAGHandler(BaseChatHandler):
         chunks = self.text_splitter.split_texts([content])
         return chunks
     
+    def _vector_count(self) -> int:
+        """Number of chunks currently searchable"""
+        return 0 if self.embeddings is None else len(self.embeddings)
+
+    @staticmethod
+    def _append_rows(buf: Optional[np.ndarray], view: Optional[np.ndarray],
+                     new_rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Append rows to a geometrically-grown embedding buffer
+
+        Returns (buffer, view): the view is the contiguous prefix of the
+        buffer holding the live rows, which is what searches use. The
+        buffer doubles when full, so N single-document appends cost
+        O(N) amortized copies instead of O(N^2) full-matrix vstacks.
+        """
+        used = 0 if view is None else len(view)
+        needed = used + len(new_rows)
+        if buf is None or needed > len(buf):
+            capacity = max(64, 2 * needed)
+            new_buf = np.empty((capacity, new_rows.shape[1]), dtype=new_rows.dtype)
+            if used:
+                new_buf[:used] = view
+            buf = new_buf
+        buf[used:needed] = new_rows
+        return buf, buf[:needed]
+
+    def _store_dtype(self):
+        """Storage dtype for embedding rows (float16 when quantized)"""
+        return np.float16 if self.config.get('quantize_embeddings') else np.float32
+
+    def _normalized_matrix(self, vectors) -> np.ndarray:
+        """Stack embeddings into a contiguous, L2-normalized matrix"""
+        mat = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        np.divide(mat, norms, out=mat, where=norms > 0)
+        dtype = self._store_dtype()
+        return mat if dtype is np.float32 else mat.astype(dtype)
+
+    async def _matrix_search(self, query: str, k: int,
+                             embeddings: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Top-k cosine search over an embedding matrix
+
+        Returns (chunk index, score) pairs so callers address chunk
+        metadata by id directly - no matching of result text back to
+        chunks. One BLAS matrix-vector product computes every score and
+        np.argpartition keeps top-k selection O(N) instead of a full sort.
+        """
+        mat = self.embeddings if embeddings is None else embeddings
+        if mat is None or len(mat) == 0:
+            return []
+        query_vec = np.asarray(
+            (await self.embedding_model.async_get_embeddings([query]))[0],
+            dtype=np.float32,
+        )
+        norm = np.linalg.norm(query_vec)
+        if norm > 0:
+            query_vec /= norm
+        if mat.dtype == np.float32:
+            scores = mat @ query_vec
+        else:
+            # Quantized store: decode row blocks to float32 for BLAS so
+            # the transient copy stays bounded while the matrix at rest
+            # holds half-precision rows
+            scores = np.empty(len(mat), dtype=np.float32)
+            for start in range(0, len(mat), _SCORE_BLOCK_ROWS):
+                block = mat[start:start + _SCORE_BLOCK_ROWS]
+                scores[start:start + len(block)] = block.astype(np.float32) @ query_vec
+        k = min(k, len(scores))
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(i), float(scores[i])) for i in top]
+
+    async def _embed_all_concurrent(self, texts: List[str], batch_size: int = 256,
+                                    max_inflight: int = 8) -> list:
+        """Embed a large text list as concurrent bounded batches
+
+        Splits texts into batches and keeps up to max_inflight requests
+        to the embeddings API in the air at once, so a big index build
+        overlaps network round-trips instead of serializing them. The
+        semaphore caps concurrency to stay inside rate limits; results
+        come back in input order.
+        """
+        if len(texts) <= batch_size:
+            return await self.embedding_model.async_get_embeddings(texts)
+
+        semaphore = asyncio.Semaphore(max_inflight)
+
+        async def embed_batch(batch: List[str]) -> list:
+            async with semaphore:
+                return await self.embedding_model.async_get_embeddings(batch)
+
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        embedded = await asyncio.gather(*(embed_batch(b) for b in batches))
+        return [vector for batch in embedded for vector in batch]
+
+    def _split_document(self, doc: dict, splitter, chunk_size: int,
+                        chunk_overlap: int) -> List[str]:
+        """Split a document into chunks, caching by splitter settings
+
+        Document content is immutable after upload, so splitting the
+        same document with the same chunk_size/chunk_overlap always
+        yields the same chunks - rebuilds triggered by a new upload skip
+        the O(doc length) re-split of every existing document.
+        """
+        cache_key = (doc['id'], chunk_size, chunk_overlap)
+        chunks = self.doc_chunks_cache.get(cache_key)
+        if chunks is None:
+            chunks = splitter.split_texts([doc['content']])
+            self.doc_chunks_cache[cache_key] = chunks
+        return chunks
+
     @debug_track("Updating Vector Database")
     async def _update_vector_database(self):
-        """Rebuild vector database with all documents"""
-        if not self.vector_db or not self.text_splitter:
+        """Add new documents to the vector database incrementally
+
+        Documents already in the store keep their chunk ids and
+        embeddings; only chunks from not-yet-indexed documents are
+        embedded and appended. A full rebuild only happens when the
+        store is out of sync with the upload list (e.g. after a clear
+        or a chunking configuration change).
+        """
+        if not self.text_splitter:
             raise ValueError("Components not initialized")
         
         if not self.uploaded_documents:
             return
         
-        # Clear previous metadata
-        self.chunk_metadata = {}
-        self.chunk_to_doc_mapping = {}
+        current_ids = {doc['id'] for doc in self.uploaded_documents}
+        incremental = (self._indexed_doc_ids
+                       and self._indexed_doc_ids <= current_ids
+                       and self.embeddings is not None)
+        if not incremental:
+            # Start from scratch
+            self.chunk_metadata = {}
+            self.chunk_to_doc_mapping = {}
+            self.doc_to_chunk_ids = {}
+            self.chunk_texts = []
+            self.embeddings = None
+            self._embeddings_buf = None
+            self._indexed_doc_ids = set()
         
-        all_chunks = []
-        global_chunk_idx = 0
+        new_chunks = []
+        staged_metadata = {}
+        staged_mapping = {}
+        staged_doc_chunk_ids = {}
+        staged_doc_ids = []
+        global_chunk_idx = len(self.chunk_texts)
         
-        # Process each document and track chunk positions
+        # Stage only documents that are not in the store yet - nothing
+        # on self is touched until their embeddings are in hand
         for doc_idx, doc in enumerate(self.uploaded_documents):
-            # Split document into chunks
-            doc_chunks = self.text_splitter.split_texts([doc['content']])
+            if doc['id'] in self._indexed_doc_ids:
+                continue
+            # Split document into chunks (cached per splitter settings)
+            doc_chunks = self._split_document(
+                doc, self.text_splitter,
+                self.config['chunk_size'], self.config['chunk_overlap']
+            )
             
             # Track metadata for each chunk
             for local_chunk_idx, chunk_text in enumerate(doc_chunks):
                 # Store chunk metadata
-                self.chunk_metadata[global_chunk_idx] = {
+                staged_metadata[global_chunk_idx] = {
                     'doc_id': doc['id'],
                     'doc_name': doc['name'],
                     'doc_idx': doc_idx,
@@ -268,16 +449,33 @@ class RAGHandler(BaseChatHandler):
                 }
                 
                 # Store reverse mapping
-                self.chunk_to_doc_mapping[global_chunk_idx] = {
+                staged_mapping[global_chunk_idx] = {
                     'doc_id': doc['id'],
                     'local_idx': local_chunk_idx
                 }
+                staged_doc_chunk_ids.setdefault(doc['id'], []).append(global_chunk_idx)
                 
-                all_chunks.append(chunk_text)
+                new_chunks.append(chunk_text)
                 global_chunk_idx += 1
+            
+            staged_doc_ids.append(doc['id'])
         
-        # Rebuild vector database with all chunks
-        self.vector_db = await self.vector_db.abuild_from_list(all_chunks)
+        # Embed first, then commit the bookkeeping. If the embedding
+        # call raises, no document is marked indexed and no ids were
+        # assigned, so the next upload simply retries these documents -
+        # committing up front would desync chunk ids from matrix rows.
+        if new_chunks:
+            vectors = await self._embed_all_concurrent(new_chunks)
+            new_rows = self._normalized_matrix(vectors)
+            self._embeddings_buf, self.embeddings = self._append_rows(
+                self._embeddings_buf, self.embeddings, new_rows
+            )
+            self.chunk_texts.extend(new_chunks)
+            self.chunk_metadata.update(staged_metadata)
+            self.chunk_to_doc_mapping.update(staged_mapping)
+            for doc_id, chunk_ids in staged_doc_chunk_ids.items():
+                self.doc_to_chunk_ids.setdefault(doc_id, []).extend(chunk_ids)
+            self._indexed_doc_ids.update(staged_doc_ids)
         
         # Also build large chunk vector database for comparison
         await self._build_large_chunk_vector_db()
@@ -294,20 +492,35 @@ class RAGHandler(BaseChatHandler):
             chunk_overlap=self.config['chunk_overlap']  # Keep same overlap ratio
         )
         
-        # Clear previous large chunk metadata
-        self.large_chunk_metadata = {}
+        current_ids = {doc['id'] for doc in self.uploaded_documents}
+        incremental = (self._large_indexed_doc_ids
+                       and self._large_indexed_doc_ids <= current_ids
+                       and self.large_embeddings is not None)
+        if not incremental:
+            self.large_chunk_metadata = {}
+            self.large_chunk_texts = []
+            self.large_embeddings = None
+            self._large_embeddings_buf = None
+            self._large_indexed_doc_ids = set()
         
-        all_large_chunks = []
-        global_chunk_idx = 0
+        new_large_chunks = []
+        staged_metadata = {}
+        staged_doc_ids = []
+        global_chunk_idx = len(self.large_chunk_texts)
         
-        # Process each document with large chunks
+        # Stage only documents that are not in the store yet
         for doc_idx, doc in enumerate(self.uploaded_documents):
-            # Split document into large chunks
-            large_chunks = large_splitter.split_texts([doc['content']])
+            if doc['id'] in self._large_indexed_doc_ids:
+                continue
+            # Split document into large chunks (cached per splitter settings)
+            large_chunks = self._split_document(
+                doc, large_splitter,
+                self.config['comparison_chunk_size'], self.config['chunk_overlap']
+            )
             
             # Track metadata for each large chunk
             for local_chunk_idx, chunk_text in enumerate(large_chunks):
-                self.large_chunk_metadata[global_chunk_idx] = {
+                staged_metadata[global_chunk_idx] = {
                     'doc_id': doc['id'],
                     'doc_name': doc['name'],
                     'doc_idx': doc_idx,
@@ -318,34 +531,42 @@ class RAGHandler(BaseChatHandler):
                     'chunk_size': len(chunk_text)
                 }
                 
-                all_large_chunks.append(chunk_text)
+                new_large_chunks.append(chunk_text)
                 global_chunk_idx += 1
+            
+            staged_doc_ids.append(doc['id'])
         
-        # Build the large chunk vector database
-        if all_large_chunks:
-            from aimakerspace.vectordatabase import VectorDatabase
-            self.large_chunk_vector_db = VectorDatabase(self.embedding_model)
-            self.large_chunk_vector_db = await self.large_chunk_vector_db.abuild_from_list(all_large_chunks)
+        # Embed first, then commit - same failure contract as the main
+        # store: a failed embedding call leaves the store untouched and
+        # the documents eligible for retry on the next upload
+        if new_large_chunks:
+            vectors = await self._embed_all_concurrent(new_large_chunks)
+            new_rows = self._normalized_matrix(vectors)
+            self._large_embeddings_buf, self.large_embeddings = self._append_rows(
+                self._large_embeddings_buf, self.large_embeddings, new_rows
+            )
+            self.large_chunk_texts.extend(new_large_chunks)
+            self.large_chunk_metadata.update(staged_metadata)
+            self._large_indexed_doc_ids.update(staged_doc_ids)
     
     @debug_track("Searching Documents")
     async def search_documents(self, query: str, api_key: str, k: int = None) -> list:
         """Search documents using vector database with optional adjacent chunk expansion"""
-        if not self.vector_db or len(self.vector_db.vectors) == 0:
+        if self._vector_count() == 0:
             return []
         
         k = k or self.config['search_k']
         adjacent = self.config.get('adjacent_chunks', 0)
         
-        # Initial search
-        initial_results = self.vector_db.search_by_text(query, k=k)
+        # Initial search returns chunk indices directly
+        initial_results = await self._matrix_search(query, k=k)
         
         if adjacent == 0:
             # No adjacent chunks requested, return normal results
             results = []
-            for i, (text, score) in enumerate(initial_results, 1):
-                # Find chunk metadata
-                chunk_idx = self._find_chunk_index_by_text(text)
+            for i, (chunk_idx, score) in enumerate(initial_results, 1):
                 metadata = self.chunk_metadata.get(chunk_idx, {})
+                text = metadata.get('chunk_text', '')
                 
                 results.append({
                     'rank': i,
@@ -364,25 +585,17 @@ class RAGHandler(BaseChatHandler):
         # Process with adjacent chunks
         return await self._search_with_adjacent_chunks(query, initial_results, adjacent)
     
-    def _find_chunk_index_by_text(self, text: str) -> int:
-        """Find chunk index by matching text content"""
-        for idx, metadata in self.chunk_metadata.items():
-            if metadata['chunk_text'] == text:
-                return idx
-        return -1
-    
     @debug_track("Searching with Adjacent Chunks")
     async def _search_with_adjacent_chunks(self, query: str, initial_results: list, adjacent: int) -> list:
         """Re-embed and re-score with adjacent chunks included"""
-        expanded_results = []
-        
-        for i, (chunk_text, original_score) in enumerate(initial_results):
-            # Find the chunk index
-            chunk_idx = self._find_chunk_index_by_text(chunk_text)
-            if chunk_idx == -1:
+        # First pass: expand each result with its adjacent chunks and
+        # collect the combined texts, so re-embedding happens once for
+        # the whole result set instead of per result
+        candidates = []
+        for i, (chunk_idx, original_score) in enumerate(initial_results):
+            metadata = self.chunk_metadata.get(chunk_idx)
+            if metadata is None:
                 continue
-                
-            metadata = self.chunk_metadata[chunk_idx]
             
             # Get adjacent chunks within the same document
             adjacent_chunks = self._get_adjacent_chunks(chunk_idx, adjacent)
@@ -392,16 +605,31 @@ class RAGHandler(BaseChatHandler):
                 self.chunk_metadata[idx]['chunk_text'] 
                 for idx in sorted(adjacent_chunks.keys())
             ])
+            candidates.append((i, chunk_idx, original_score, metadata, adjacent_chunks, combined_text))
+        
+        # Re-embed: the query once, and every combined text in a single
+        # batched call (one API round-trip instead of 2k of them)
+        reembed = self.config['scoring_strategy'] == 'reembed' and self.embedding_model and candidates
+        if reembed:
+            query_embedding = np.asarray(
+                (await self.embedding_model.async_get_embeddings([query]))[0],
+                dtype=np.float32,
+            )
+            combined_embeddings = await self.embedding_model.async_get_embeddings(
+                [combined_text for *_, combined_text in candidates]
+            )
+            # Stack into a (k, dim) matrix: one BLAS matrix-vector
+            # product scores every candidate at once
+            combined_matrix = np.asarray(combined_embeddings, dtype=np.float32)
+            new_scores = combined_matrix @ query_embedding
+        
+        expanded_results = []
+        for result_pos, candidate in enumerate(candidates):
+            i, chunk_idx, original_score, metadata, adjacent_chunks, combined_text = candidate
+            chunk_text = metadata['chunk_text']
             
-            # Re-embed the combined text
-            if self.config['scoring_strategy'] == 'reembed' and self.embedding_model:
-                # Create new embedding for combined text
-                combined_embedding = await self.embedding_model.async_get_embeddings([combined_text])
-                query_embedding = await self.embedding_model.async_get_embeddings([query])
-                
-                # Calculate new similarity score
-                import numpy as np
-                new_score = float(np.dot(combined_embedding[0], query_embedding[0]))
+            if reembed:
+                new_score = float(new_scores[result_pos])
             else:
                 # Use original score for now (other strategies can be added)
                 new_score = original_score
@@ -444,16 +672,14 @@ class RAGHandler(BaseChatHandler):
         doc_id = center_metadata['doc_id']
         local_idx = center_metadata['local_chunk_idx']
         
-        adjacent_chunks = {center_idx: center_metadata}
-        
-        # Find chunks from the same document
-        for idx, metadata in self.chunk_metadata.items():
-            if metadata['doc_id'] == doc_id:
-                local_distance = abs(metadata['local_chunk_idx'] - local_idx)
-                if 0 < local_distance <= adjacent:
-                    adjacent_chunks[idx] = metadata
-        
-        return adjacent_chunks
+        # A document's chunk ids are stored in local order, so its
+        # neighborhood is a direct slice - no scan over every chunk
+        doc_chunk_ids = self.doc_to_chunk_ids.get(doc_id, [center_idx])
+        start = max(0, local_idx - adjacent)
+        return {
+            idx: self.chunk_metadata[idx]
+            for idx in doc_chunk_ids[start:local_idx + adjacent + 1]
+        }
     
     @debug_track("Getting Full Document Content")
     async def get_full_document_content(self, document_id: str) -> dict:
@@ -503,22 +729,22 @@ Be concise and cite specific parts of the context when possible."""
             return f"{user_message}\n\n[Note: No documents uploaded yet. Upload documents to enable RAG functionality.]"
         
         # If vector database not ready, return message with note
-        if not self.vector_db or len(self.vector_db.vectors) == 0:
+        if self._vector_count() == 0:
             doc_names = [doc['name'] for doc in self.uploaded_documents]
             return f"{user_message}\n\n[Documents available: {', '.join(doc_names)}]\n[Note: Documents are being processed. Please try again in a moment.]"
         
         # Use RAG to answer the question
         try:
             # Search for relevant context
-            search_results = self.vector_db.search_by_text(user_message, k=self.config['rag_k'])
+            search_results = await self._matrix_search(user_message, k=self.config['rag_k'])
             
             if not search_results:
                 return f"{user_message}\n\n[Note: No relevant context found in uploaded documents.]"
             
             # Build context from search results
             context_parts = []
-            for i, (text, score) in enumerate(search_results, 1):
-                context_parts.append(f"[Context {i}]: {text}")
+            for i, (chunk_idx, score) in enumerate(search_results, 1):
+                context_parts.append(f"[Context {i}]: {self.chunk_texts[chunk_idx]}")
             
             context = "\n\n".join(context_parts)
             
@@ -556,6 +782,21 @@ Please answer based on the provided context."""
                 chunk_size=self.config['chunk_size'],
                 chunk_overlap=self.config['chunk_overlap']
             )
+            # Splits for the old settings are no longer reachable, and
+            # the stores must be rebuilt with the new chunking
+            self.doc_chunks_cache.clear()
+            self._indexed_doc_ids = set()
+            self._large_indexed_doc_ids = set()
+        
+        # Switching storage precision requires re-encoding both stores
+        if ('quantize_embeddings' in config_updates
+                and self.config['quantize_embeddings'] != old_config['quantize_embeddings']):
+            self.embeddings = None
+            self._embeddings_buf = None
+            self.large_embeddings = None
+            self._large_embeddings_buf = None
+            self._indexed_doc_ids = set()
+            self._large_indexed_doc_ids = set()
             # Mark that we need to re-process documents
             if self.uploaded_documents:
                 # We should re-process, but for now just note it
@@ -637,7 +878,7 @@ Please answer based on the provided context."""
             query = match.group(1)
             k = int(match.group(2)) if match.group(2) else 5
             
-            if not self.vector_db or len(getattr(self.vector_db, 'vectors', [])) == 0:
+            if self._vector_count() == 0:
                 return {"success": True, "output": "No vector database available. Upload documents first.", "command": command}
             
             # Use the main search method to get results with adjacent chunks if configured
@@ -730,39 +971,28 @@ Please answer based on the provided context."""
     
     async def _console_get_vector_stats(self) -> str:
         """Get vector database statistics"""
-        if not self.vector_db:
-            return "Vector database not initialized"
-        
         stats = [
             f"Vector Database Status:",
-            f"- Total vectors: {len(self.vector_db.vectors) if hasattr(self.vector_db, 'vectors') else 'Unknown'}",
+            f"- Total vectors: {self._vector_count()}",
             f"- Embedding model: {self.config['embedding_model']}",
             f"- Documents processed: {len(self.uploaded_documents)}",
-            f"- Vector database ready: {self.vector_db is not None and len(getattr(self.vector_db, 'vectors', [])) > 0}"
+            f"- Vector database ready: {self._vector_count() > 0}"
         ]
         return "\n".join(stats)
     
     async def _console_list_vectors(self) -> str:
         """List first few vectors with previews"""
-        if not self.vector_db or not hasattr(self.vector_db, 'vectors'):
-            return "No vectors available"
-        
-        vectors = self.vector_db.vectors
-        if not vectors:
+        total = self._vector_count()
+        if total == 0:
             return "Vector database is empty"
         
-        lines = [f"Vector Database Contents ({len(vectors)} total vectors):", ""]
-        vector_list = list(vectors)[:5]  # Convert to list and take first 5
-        for i, vector_data in enumerate(vector_list):  # Show first 5
-            try:
-                # Try to extract text content from vector data
-                text_content = str(vector_data)[:100] + "..." if len(str(vector_data)) > 100 else str(vector_data)
-                lines.append(f"{i+1}. {text_content}")
-            except Exception:
-                lines.append(f"{i+1}. [Vector data: {type(vector_data)}]")
+        lines = [f"Vector Database Contents ({total} total vectors):", ""]
+        for i, chunk_text in enumerate(self.chunk_texts[:5]):  # Show first 5
+            text_content = chunk_text[:100] + "..." if len(chunk_text) > 100 else chunk_text
+            lines.append(f"{i+1}. {text_content}")
         
-        if len(vectors) > 5:
-            lines.append(f"... and {len(vectors) - 5} more vectors")
+        if total > 5:
+            lines.append(f"... and {total - 5} more vectors")
         
         return "\n".join(lines)
     
@@ -794,13 +1024,13 @@ Please answer based on the provided context."""
             f"- Documents uploaded: {len(self.uploaded_documents)}",
             f"- Text splitter ready: {self.text_splitter is not None}",
             f"- Embedding model ready: {self.embedding_model is not None}",
-            f"- Vector database ready: {self.vector_db is not None}",
+            f"- Vector database ready: {self._vector_count() > 0}",
             f"- Chat model ready: {self.chat_model is not None}",
             ""
         ]
         
-        if self.vector_db and hasattr(self.vector_db, 'vectors'):
-            lines.append(f"- Total vectors in database: {len(self.vector_db.vectors)}")
+        if self._vector_count() > 0:
+            lines.append(f"- Total vectors in database: {self._vector_count()}")
         
         if self.uploaded_documents:
             total_size = sum(doc['size'] for doc in self.uploaded_documents)
@@ -884,7 +1114,7 @@ Examples:
             query = match.group(1)
             k = int(match.group(2)) if match.group(2) else 5
             
-            if not self.vector_db or len(getattr(self.vector_db, 'vectors', [])) == 0:
+            if self._vector_count() == 0:
                 return {"success": True, "output": "No vector database available. Upload documents first.", "command": command}
             
             current_adjacent = self.config.get('adjacent_chunks', 1)
@@ -947,7 +1177,7 @@ Examples:
             k = int(match.group(2)) if match.group(2) else 5
             chars = int(match.group(3)) if match.group(3) else None  # None means show full text
             
-            if not self.vector_db or len(getattr(self.vector_db, 'vectors', [])) == 0:
+            if self._vector_count() == 0:
                 return {"success": True, "output": "No vector database available. Upload documents first.", "command": command}
             
             current_adjacent = self.config.get('adjacent_chunks', 1)
@@ -970,12 +1200,11 @@ Examples:
             
             # Method 3: Large chunks from the start
             large_results = []
-            if self.large_chunk_vector_db and len(getattr(self.large_chunk_vector_db, 'vectors', [])) > 0:
-                large_search_results = self.large_chunk_vector_db.search_by_text(query, k=k)
-                for i, (text, score) in enumerate(large_search_results):
-                    # Find metadata for large chunk
-                    chunk_idx = self._find_large_chunk_index_by_text(text)
+            if self.large_embeddings is not None and len(self.large_embeddings) > 0:
+                large_search_results = await self._matrix_search(query, k=k, embeddings=self.large_embeddings)
+                for i, (chunk_idx, score) in enumerate(large_search_results):
                     metadata = self.large_chunk_metadata.get(chunk_idx, {})
+                    text = metadata.get('chunk_text', '')
                     
                     large_results.append({
                         'rank': i + 1,
@@ -1074,10 +1303,4 @@ Examples:
             
         except Exception as e:
             return {"success": False, "output": f"Error in comprehensive comparison: {str(e)}", "command": command}
-    
-    def _find_large_chunk_index_by_text(self, text: str) -> int:
-        """Find large chunk index by matching text content"""
-        for idx, metadata in self.large_chunk_metadata.items():
-            if metadata['chunk_text'] == text:
-                return idx
-        return -1
\ No newline at end of file
+    
\ No newline at end of file